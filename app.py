@@ -1,20 +1,131 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import bisect
+import contextvars
+import gzip
+import hashlib
+import heapq
+import hmac
+import itertools
 import json
 import os
+import queue
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed, wait,
+)
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
-from statbotics import Statbotics
 import traceback
 
 app = Flask(__name__)
 
 # Load API key from environment
 TBA_AUTH_KEY = os.getenv('TBA_AUTH_KEY')
-TBA_API_BASE = 'https://www.thebluealliance.com/api/v3'
-sb = Statbotics()
+TBA_API_BASE = os.getenv('TBA_API_BASE', 'https://www.thebluealliance.com/api/v3').rstrip('/')
+STATBOTICS_API_BASE = os.getenv('STATBOTICS_API_BASE', 'https://api.statbotics.io/v3').rstrip('/')
 
 NOTES_FILE = 'team_notes.json'
 FAVORITES_FILE = 'favorites.json'
+CACHE_DB = os.getenv('TBA_CACHE_DB', 'tba_cache.sqlite3')
+SCOUT_DB = os.getenv('SCOUT_DB', 'scout_data.sqlite3')
+CURRENT_EVENT = os.getenv('CURRENT_EVENT')
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshots')
+CURRENT_SEASON = int(os.getenv('CURRENT_SEASON', '2025'))
+FIRST_SEASON = 1992
+OFFLINE_SNAPSHOT = os.getenv('OFFLINE_SNAPSHOT')
+
+def gevent_patched():
+    # True inside a gunicorn gevent worker, where threads are greenlets
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+def connection_local():
+    # SQLite connections are kept per thread. Under gevent threading.local is
+    # per greenlet, i.e. a new connection per request; SQLite calls never
+    # yield, so a worker's greenlets share its one OS thread's connection.
+    if gevent_patched():
+        from gevent import monkey
+        return monkey.get_original('threading', 'local')()
+    return threading.local()
+
+# Shared pool for fanning out upstream calls, and how long (seconds) each
+# team_lookup section may wait on its source before falling back. Greenlets
+# are cheap, so under gevent the pool can hold every in-flight call.
+UPSTREAM_WORKERS = int(os.getenv('UPSTREAM_WORKERS', '256' if gevent_patched() else '16'))
+
+# Who is waiting on an upstream call: a scout's request, an event prewarm or
+# the background refresher. The pool and the rate limiter serve lower first.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_PREWARM = 1
+PRIORITY_BACKGROUND = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: 'interactive', PRIORITY_PREWARM: 'prewarm', PRIORITY_BACKGROUND: 'background'}
+
+upstream_priority = contextvars.ContextVar('upstream_priority', default=PRIORITY_BACKGROUND)
+
+@contextmanager
+def upstream_priority_as(priority):
+    token = upstream_priority.set(priority)
+    try:
+        yield
+    finally:
+        upstream_priority.reset(token)
+
+class PriorityWorkQueue(queue.PriorityQueue):
+    # Hands idle pool threads the most urgent task first, so a lookup never
+    # waits behind an event prewarm's backlog. None (shutdown) goes last.
+    def __init__(self):
+        super().__init__()
+        self.order = itertools.count()
+
+    def _put(self, item):
+        priority = len(PRIORITY_NAMES) if item is None else upstream_priority.get()
+        super()._put((priority, next(self.order), item))
+
+    def _get(self):
+        return super()._get()[2]
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    # Runs each task in a copy of the caller's contextvars so upstream spans
+    # land in the trace of the request that submitted them.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._work_queue = PriorityWorkQueue()
+
+    def submit(self, fn, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+upstream_pool = ContextThreadPoolExecutor(max_workers=UPSTREAM_WORKERS, thread_name_prefix='upstream')
+SECTION_TIMEOUTS = {
+    'team': 8,
+    'events': 8,
+    'statbotics': 6,
+    'awards': 6,
+    'last_event': 12,
+}
+
+# (connect, read) timeouts in seconds for every upstream HTTP call
+HTTP_TIMEOUT = (
+    float(os.getenv('HTTP_CONNECT_TIMEOUT', '3.05')),
+    float(os.getenv('HTTP_READ_TIMEOUT', '10')),
+)
+
+@app.before_request
+def ensure_background_refresher():
+    start_background_refresher()
 
 @app.route('/')
 def home():
@@ -29,38 +140,101 @@ def ask():
         if not user_input:
             return jsonify({'reply': "Please provide a team number or a note!"})
 
-        # --- IMPORTANT: Check more specific commands first ---
-        command_type = parse_command(user_input)
-
-        if command_type == 'compare':
-            return compare_teams(user_input)
-        elif command_type == 'search_notes':
-            return search_notes(user_input)
-        elif command_type == 'list_favorites':
-            return list_favorites()
-        elif command_type == 'list_notes':
-            return list_notes()
-        elif command_type == 'unfavorite':
-            return unfavorite_team(user_input)
-        elif command_type == 'favorite':
-            return favorite_team(user_input)
-        elif command_type == 'delete_note':
-            return delete_note(user_input)
-        elif command_type == 'edit_note':
-            return edit_note(user_input)
-        elif command_type == 'note':
-            return add_note(user_input)
-        else:
-            # Default fallback: treat input as team lookup
-            return team_lookup(user_input)
-
-        # Default: treat input as team lookup
-        return team_lookup(user_input)
+        with request_trace(parse_command(user_input)):
+            return dispatch_command(user_input)
 
     except Exception as e:
         traceback.print_exc()
         return jsonify({'reply': "⚠️ Sorry, something unexpected happened while scouting. Please try again."})
 
+@app.route('/ask/stream', methods=['POST'])
+def ask_stream():
+    """
+    Same commands as /ask, as server-sent events. Team lookups send each reply
+    section as soon as its data arrives (header and notes right away); every
+    other command sends its whole reply as one event.
+    """
+    data = request.get_json() or {}
+    user_input = data.get('team_number')
+
+    def generate():
+        try:
+            team_number = None
+            if user_input and parse_command(user_input) == 'team_lookup':
+                team_number = resolve_team(user_input)[0]
+
+            if not user_input:
+                yield sse_event('reply', {'reply': "Please provide a team number or a note!"})
+            elif team_number:
+                with request_trace('team_lookup'):
+                    yield sse_event('start', {'sections': TEAM_SECTIONS})
+                    for section, text in team_lookup_sections(team_number, extract_season(user_input, team_number)):
+                        if section == 'error':
+                            yield sse_event('reply', {'reply': text})
+                            break
+                        yield sse_event('section', {'section': section, 'text': text})
+            else:
+                with request_trace(parse_command(user_input)):
+                    reply = dispatch_command(user_input).get_json()
+                yield sse_event('reply', reply)
+        except Exception:
+            traceback.print_exc()
+            yield sse_event('reply', {'reply': "⚠️ Sorry, something unexpected happened while scouting. Please try again."})
+        yield sse_event('done', {})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@app.route('/metrics')
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def dispatch_command(user_input):
+    # --- IMPORTANT: Check more specific commands first ---
+    command_type = parse_command(user_input)
+
+    if command_type == 'cache_stats':
+        return cache_stats()
+    elif command_type == 'load_event':
+        return load_event(user_input)
+    elif command_type == 'export_event':
+        return export_event(user_input)
+    elif command_type == 'offline':
+        return go_offline(user_input)
+    elif command_type == 'online':
+        return go_online()
+    elif command_type == 'compare':
+        return compare_teams(user_input)
+    elif command_type == 'search_notes':
+        return search_notes(user_input)
+    elif command_type == 'list_favorites':
+        return list_favorites()
+    elif command_type == 'list_notes':
+        return list_notes()
+    elif command_type == 'unfavorite':
+        return unfavorite_team(user_input)
+    elif command_type == 'favorite':
+        return favorite_team(user_input)
+    elif command_type == 'delete_note':
+        return delete_note(user_input)
+    elif command_type == 'edit_note':
+        return edit_note(user_input)
+    elif command_type == 'note':
+        return add_note(user_input)
+    elif command_type == 'history':
+        return team_history(user_input)
+    elif command_type == 'picklist':
+        return picklist(user_input)
+    else:
+        # Default fallback: treat input as team lookup
+        return team_lookup(user_input)
+
 # --- Make input variances forgiving ---
 def parse_command(user_input):
     """
@@ -87,99 +261,201 @@ def parse_command(user_input):
         return 'compare'
     elif lowered_input.startswith('unfavorite'):
         return 'unfavorite'
+    elif lowered_input.startswith('cachestats'):
+        return 'cache_stats'
+    elif lowered_input.startswith('loadevent'):
+        return 'load_event'
+    elif lowered_input.startswith('exportevent'):
+        return 'export_event'
+    elif lowered_input.startswith('offline'):
+        return 'offline'
+    elif lowered_input.startswith('online'):
+        return 'online'
+    elif lowered_input.startswith('history'):
+        return 'history'
+    elif lowered_input.startswith('picklist'):
+        return 'picklist'
     else:
         return 'team_lookup'
 
 # --- Team Lookup and Integrations ---
 
+# Reply sections, in display order
+TEAM_SECTIONS = ['header', 'epa', 'notes', 'last_event', 'opinion', 'season']
+
 def team_lookup(user_input):
-    team_number = extract_team_number(user_input)
+    team_number, suggestions = resolve_team(user_input)
     if not team_number:
-        return jsonify({'reply': "Hmm... I didn't understand that team number. Please try again!"})
+        return jsonify({'reply': team_suggestions_reply(
+            suggestions, "Hmm... I didn't understand that team number. Please try again!")})
 
-    headers = {"X-TBA-Auth-Key": TBA_AUTH_KEY}
+    sections = {}
+    for section, text in team_lookup_sections(team_number, extract_season(user_input, team_number)):
+        if section == 'error':
+            return jsonify({'reply': text})
+        sections[section] = text
 
-    # Pull team general info
-    team_url = f"{TBA_API_BASE}/team/frc{team_number}"
-    team_response = requests.get(team_url, headers=headers)
+    reply = "".join(sections[section] for section in TEAM_SECTIONS)
+    return jsonify({'reply': reply})
 
-    if team_response.status_code != 200:
-        return jsonify({'reply': f"Sorry, I couldn't find team {team_number}. Please double check the number."})
+def team_lookup_sections(team_number, year=CURRENT_SEASON):
+    """
+    Yields (section, text) pairs for a team lookup as soon as each section's
+    data is in, so callers can stream them. The header is sent twice: right
+    away with just the team number, then again once TBA returns the team's
+    details. Yields ('error', message) and stops if TBA doesn't know the team.
+    """
+    # Fan out every upstream call at once; each section waits only on its own calls
+    started = time.monotonic()
+    team_future = upstream_pool.submit(tba_get, f"/team/frc{team_number}")
+    events_list_future = upstream_pool.submit(tba_get, f"/team/frc{team_number}/events/{year}")
+    events_status_future = upstream_pool.submit(tba_get, f"/team/frc{team_number}/events/{year}/statuses")
+    statbotics_future = upstream_pool.submit(fetch_statbotics_info, team_number, year)
+    last_event_future = submit_after(events_list_future, generate_last_event_statistics, team_number, year=year)
+    scout_opinion_future = upstream_pool.submit(generate_scout_opinion, team_number, year)
 
-    team_info = team_response.json()
-    nickname = team_info.get('nickname', 'Unknown Nickname')
-    city = team_info.get('city', 'Unknown City')
-    state = team_info.get('state_prov', '')
-    country = team_info.get('country', '')
-    
     # --- Check if team is favorited
-    favorites = load_favorites()
-    favorited_text = "⭐ Favorited Team!\n\n" if str(team_number) in favorites else ""
+    favorited_text = "⭐ Favorited Team!\n\n" if is_favorite(team_number) else ""
 
-    # Pull event names
-    events_list_url = f"{TBA_API_BASE}/team/frc{team_number}/events/2025"
-    events_list_response = requests.get(events_list_url, headers=headers)
-    events_list = events_list_response.json() if events_list_response.status_code == 200 else []
+    yield 'header', f"🏷️ Team {team_number}\n{favorited_text}\n"
 
-    # Pull event statuses
-    events_status_url = f"{TBA_API_BASE}/team/frc{team_number}/events/2025/statuses"
-    events_status_response = requests.get(events_status_url, headers=headers)
-    events_info = events_status_response.json() if events_status_response.status_code == 200 else {}
+    if year == CURRENT_SEASON:
+        record_team_view(team_number)
 
-    event_summary = generate_event_summary(events_info, events_list)
+    # --- Load notes
+    team_notes = load_team_notes(team_number)
+    notes_text = "\n".join(f"- {note['text']} (added {note['timestamp']})" for note in team_notes) if team_notes else "No custom notes yet."
 
-    # Pull Statbotics data
-    statbotics_info = fetch_statbotics_info(team_number)
+    yield 'notes', f"📝 Human Scout Notes:\n{notes_text}\n\n"
 
-    # --- EPA Summary
-    if statbotics_info:
-        epa_data = statbotics_info.get('epa', {})
-        epa = epa_data.get('total_points', {}).get('mean', 'Not Available')
-        epa_rank = epa_data.get('ranks', {}).get('total', {}).get('rank', 'Not Available')
-        auto_epa = epa_data.get('breakdown', {}).get('auto_points', 'Not Available')
-        teleop_epa = epa_data.get('breakdown', {}).get('teleop_points', 'Not Available')
-
-        epa_summary = (
-            f"📊 EPA Data:\n"
-            f"Overall EPA: {round(epa, 1) if isinstance(epa, (int, float)) else epa} (Rank #{epa_rank})\n"
-            f"Auto Phase EPA: {round(auto_epa, 1) if isinstance(auto_epa, (int, float)) else auto_epa}\n"
-            f"Teleop Phase EPA: {round(teleop_epa, 1) if isinstance(teleop_epa, (int, float)) else teleop_epa}\n"
+    def header():
+        # Pull team general info
+        team_response = section_result(team_future, started, 'team', None)
+        if team_response is not None and team_response.status_code != 200:
+            return None
+
+        team_info = team_response.json() if team_response is not None else {}
+        nickname = team_info.get('nickname', 'Unknown Nickname')
+        city = team_info.get('city', 'Unknown City')
+        state = team_info.get('state_prov', '')
+        country = team_info.get('country', '')
+
+        return (
+            f"🏷️ Team {team_number} - {nickname}\n"
+            f"📍 Location: {city}, {state}, {country}\n"
+            f"{favorited_text}\n"
         )
-    else:
-        epa_summary = "📊 EPA Data not available."
 
-    # Fetch Last Event Statistics (NEW)
-    last_event_stats = generate_last_event_statistics(team_number)
+    def epa():
+        statbotics_info = section_result(statbotics_future, started, 'statbotics', None)
+
+        if statbotics_info:
+            epa_data = statbotics_info.get('epa', {})
+            epa = epa_data.get('total_points', {}).get('mean', 'Not Available')
+            epa_rank = epa_data.get('ranks', {}).get('total', {}).get('rank', 'Not Available')
+            auto_epa = epa_data.get('breakdown', {}).get('auto_points', 'Not Available')
+            teleop_epa = epa_data.get('breakdown', {}).get('teleop_points', 'Not Available')
+
+            epa_summary = (
+                f"📊 EPA Data:\n"
+                f"Overall EPA: {round(epa, 1) if isinstance(epa, (int, float)) else epa} (Rank #{epa_rank})\n"
+                f"Auto Phase EPA: {round(auto_epa, 1) if isinstance(auto_epa, (int, float)) else auto_epa}\n"
+                f"Teleop Phase EPA: {round(teleop_epa, 1) if isinstance(teleop_epa, (int, float)) else teleop_epa}\n"
+            )
+        else:
+            epa_summary = "📊 EPA Data not available."
+        return f"{epa_summary}\n"
+
+    def last_event():
+        last_event_stats = section_result(last_event_future, started, 'last_event', "⭐ Last Event Statistics not available.")
+        return f"{last_event_stats}\n\n"
+
+    def opinion():
+        # --- Generate scouting opinion
+        scout_opinion = section_result(scout_opinion_future, started, 'awards', "🏅 Award history not available right now.")
+        statbotics_opinion = generate_statbotics_opinion(section_result(statbotics_future, started, 'statbotics', None))
+        return f"🧠 Scout Opinion:\n{scout_opinion} {statbotics_opinion}\n\n"
+
+    def season():
+        # Pull event names and statuses
+        events_list_response = section_result(events_list_future, started, 'events', None)
+        events_list = events_list_response.json() if events_list_response is not None and events_list_response.status_code == 200 else []
+
+        events_status_response = section_result(events_status_future, started, 'events', None)
+        events_info = events_status_response.json() if events_status_response is not None and events_status_response.status_code == 200 else {}
+
+        event_summary = generate_event_summary(events_info, events_list)
+        return f"📜 {year} Season Summary:\n{event_summary}"
+
+    # section -> (renderer, futures it needs, deadline)
+    pending = {
+        'header': (header, [team_future], started + SECTION_TIMEOUTS['team']),
+        'epa': (epa, [statbotics_future], started + SECTION_TIMEOUTS['statbotics']),
+        'last_event': (last_event, [last_event_future], started + SECTION_TIMEOUTS['last_event']),
+        'opinion': (opinion, [scout_opinion_future, statbotics_future],
+                    started + max(SECTION_TIMEOUTS['awards'], SECTION_TIMEOUTS['statbotics'])),
+        'season': (season, [events_list_future, events_status_future], started + SECTION_TIMEOUTS['events']),
+    }
+
+    while pending:
+        now = time.monotonic()
+        for section in [name for name, (_, futures, deadline) in pending.items()
+                        if now >= deadline or all(f.done() for f in futures)]:
+            render = pending.pop(section)[0]
+            text = render()
+            record_span('section', time.monotonic() - started, section=section)
+            if text is None:
+                yield 'error', f"Sorry, I couldn't find team {team_number}. Please double check the number."
+                return
+            yield section, text
+
+        if pending:
+            waiting_on = {f for _, futures, _ in pending.values() for f in futures if not f.done()}
+            next_deadline = min(deadline for _, _, deadline in pending.values())
+            wait(waiting_on, timeout=max(next_deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+
+def submit_after(future, fn, team_number, **kwargs):
+    """
+    Runs fn(team_number, events, **kwargs) on the upstream pool once the events
+    list future finishes, without parking a worker thread while it waits.
+    """
+    chained = Future()
 
-    # --- Load notes
-    notes = load_team_notes()
-    team_notes = notes.get(str(team_number), [])
-    notes_text = "\n".join(f"- {note['text']} (added {note['timestamp']})" for note in team_notes) if team_notes else "No custom notes yet."
+    def start(done):
+        try:
+            response = done.result()
+            events = response.json() if response.status_code == 200 else None
+            inner = upstream_pool.submit(fn, team_number, events, **kwargs)
+        except Exception:
+            inner = upstream_pool.submit(fn, team_number, **kwargs)
+        inner.add_done_callback(finish)
 
-    # --- Generate scouting opinion
-    scout_opinion = generate_scout_opinion(team_number)
-    statbotics_opinion = generate_statbotics_opinion(statbotics_info)
+    def finish(inner):
+        if inner.exception():
+            chained.set_exception(inner.exception())
+        else:
+            chained.set_result(inner.result())
 
-    reply = (
-        f"🏷️ Team {team_number} - {nickname}\n"
-        f"📍 Location: {city}, {state}, {country}\n"
-        f"{favorited_text}\n"
-        
-        f"{epa_summary}\n"
-
-        f"📝 Human Scout Notes:\n"
-        f"{notes_text}\n\n"
-        
-        f"{last_event_stats}\n\n"
-        
-        f"🧠 Scout Opinion:\n"
-        f"{scout_opinion} {statbotics_opinion}\n\n"
-        
-        f"📜 2025 Season Summary:\n"
-        f"{event_summary}"
-    )
+    # Callbacks run on whichever thread finished `future`; keep the caller's
+    # trace and upstream priority for the chained call
+    context = contextvars.copy_context()
+    future.add_done_callback(lambda done: context.run(start, done))
+    return chained
 
-    return jsonify({'reply': reply})
+def section_result(future, started, section, fallback):
+    """
+    Waits for one upstream call, bounded by that section's own timeout
+    (measured from when the lookup fanned out). A slow or failed source
+    falls back to `fallback` instead of sinking the whole reply.
+    """
+    timeout = SECTION_TIMEOUTS[section]
+    try:
+        return future.result(timeout=max(started + timeout - time.monotonic(), 0))
+    except FutureTimeoutError:
+        print(f"⏱️ {section} lookup timed out after {timeout}s")
+    except Exception as e:
+        print(f"💥 Error fetching {section} data: {e}")
+    return fallback
 
 # --- Helper Functions ---
 
@@ -190,6 +466,15 @@ def extract_team_number(text):
             return num
     return None
 
+def extract_season(text, team_number):
+    # "1507 2024" or "cheesy poofs 2024": a valid season besides the team number; otherwise this season
+    numbers = [num for num in ''.join(c if c.isdigit() else ' ' for c in text).split() if len(num) >= 3]
+    if team_number in numbers:
+        numbers.remove(team_number)
+    if numbers and FIRST_SEASON <= int(numbers[0]) <= CURRENT_SEASON:
+        return int(numbers[0])
+    return CURRENT_SEASON
+
 def generate_event_summary(events_info, events_list):
     if not events_info:
         return "No events found."
@@ -213,24 +498,25 @@ def generate_event_summary(events_info, events_list):
             continue
     return ' '.join(summaries)
 
-def fetch_statbotics_info(team_number):
+def fetch_statbotics_info(team_number, year=CURRENT_SEASON):
     try:
-        data = sb.get_team_year(int(team_number), 2025)
-        return data
+        response = statbotics_get(f"/team_year/{int(team_number)}/{year}")
+        response.raise_for_status()
+        return response.json()
     except Exception as e:
         print(f"Error fetching Statbotics data for team {team_number}: {e}")
         return None
 
-def generate_scout_opinion(team_number):
-    headers = {"X-TBA-Auth-Key": TBA_AUTH_KEY}
-    awards_url = f"{TBA_API_BASE}/team/frc{team_number}/awards/2025"
-    awards_response = requests.get(awards_url, headers=headers)
+def generate_scout_opinion(team_number, year=CURRENT_SEASON):
+    awards_response = tba_get(f"/team/frc{team_number}/awards/{year}")
     num_awards = len(awards_response.json()) if awards_response.status_code == 200 else 0
 
     if num_awards >= 3:
         return "🏅 Multiple award-winning team this season."
     elif num_awards >= 1:
         return "🎖️ Recognized with at least one award."
+    elif year < CURRENT_SEASON:
+        return "🧹 No awards that season."
     else:
         return "🧹 No awards yet — a true underdog story in progress."
 
@@ -308,109 +594,51 @@ def generate_statbotics_opinion(statbotics_info):
 
     return " ".join(opinion_parts)
     
-def generate_last_event_statistics(team_number):
+def generate_last_event_statistics(team_number, events=None, year=CURRENT_SEASON):
     try:
-        headers = {
-            "X-TBA-Auth-Key": TBA_AUTH_KEY
-        }
-
         team_key = f"frc{team_number}"
 
-        # Step 1: Pull list of 2025 events
-        events_url = f"{TBA_API_BASE}/team/{team_key}/events/2025/simple"
-        events_response = requests.get(events_url, headers=headers)
-        events_response.raise_for_status()
-        events = events_response.json()
+        # Step 1: Pull the season's events (team_lookup hands over the list it already has)
+        if events is None:
+            events = fetch_team_events(team_number, year)
 
         if not events:
             return "⭐ No event data available."
 
         # Step 2: Find latest event where matches exist
-        matches = []
-        event_name = "Unknown Event"
-        for event in sorted(events, key=lambda e: e.get('end_date', ''), reverse=True):
-            event_key = event.get('key')
-            event_name = event.get('name', 'Unknown Event')
-
-            matches_url = f"{TBA_API_BASE}/event/{event_key}/matches"
-            matches_response = requests.get(matches_url, headers=headers)
-            matches_response.raise_for_status()
-            matches = matches_response.json()
-
-            if matches:  # Found event with matches
-                break
-        else:
+        last_event = find_last_event(events)
+        if last_event is None:
             return "⭐ No valid event with match data available."
+        event, event_index = last_event
+        event_name = event.get('name', 'Unknown Event')
 
-        # Step 3: Initialize totals
-        total_auto_coral = 0
-        total_teleop_coral = 0
-        total_processor_algae = 0
-        total_barge_algae = 0
-        total_park = 0
-        total_deep_climb = 0
-        total_shallow_climb = 0
-        matches_played = 0
-
-        for match in matches:
-            alliances = match.get('alliances', {})
-            blue = alliances.get('blue', {})
-            red = alliances.get('red', {})
-            score_breakdown = match.get('score_breakdown', {})
-
-            if not score_breakdown:
-                continue  # Skip matches with no breakdown
-
-            if team_key in blue.get('team_keys', []):
-                breakdown = score_breakdown.get('blue', {})
-            elif team_key in red.get('team_keys', []):
-                breakdown = score_breakdown.get('red', {})
-            else:
-                continue  # Team didn't play in this match
-
-            if not breakdown:
-                continue
-
-            # Add up scoring fields
-            total_auto_coral += breakdown.get('autoCoralCount', 0)
-            total_teleop_coral += breakdown.get('teleopCoralCount', 0)
-            total_processor_algae += breakdown.get('wallAlgaeCount', 0)
-            total_barge_algae += breakdown.get('netAlgaeCount', 0)
-
-            # Track endgame results
-            for robot_key in ['endGameRobot1', 'endGameRobot2', 'endGameRobot3']:
-                climb_result = breakdown.get(robot_key, "")
-                if climb_result == "OnStage":
-                    total_deep_climb += 1
-                elif climb_result == "HarmonyStage":
-                    total_shallow_climb += 1
-                elif climb_result == "Park":
-                    total_park += 1
-                # Ignore "FailedAttempt" and "None"
-
-            matches_played += 1
-
-        if matches_played == 0:
+        # Step 3: Read the team's share of its alliances' scoring
+        stats = team_event_contributions(event_index, team_key)
+        if not stats:
             return "⭐ No valid match data available."
 
-        # Step 4: Calculate averages
-        avg_auto_coral = total_auto_coral / matches_played
-        avg_teleop_coral = total_teleop_coral / matches_played
-        avg_processor_algae = total_processor_algae / matches_played
-        avg_barge_algae = total_barge_algae / matches_played
-
-        avg_park = total_park / matches_played
-        avg_deep_climb = total_deep_climb / matches_played
-        avg_shallow_climb = total_shallow_climb / matches_played
+        # Step 4: Format the output
+        if year != BREAKDOWN_SEASON:
+            # Other games score differently; only the point totals carry over
+            return (
+                f"🏟️ Most Recent Event Statistics from {event_name}.\n"
+                f"(based on {stats['matches_played']} matches; per-robot estimates from OPR)\n\n"
+                f"• OPR: {stats['opr']:.1f}\n"
+                f"• Auto Points: {stats['auto_points']:.1f}\n"
+                f"• Teleop Points: {stats['teleop_points']:.1f}\n"
+            )
 
-        # Step 5: Format the output
         stats_report = (
             f"🏟️ Most Recent Event Statistics from {event_name}.\n"
-            f"(based on {matches_played} matches)\n\n"
-            f"• Auto Coral (Alliance Average): {avg_auto_coral:.1f}\n"
-            f"• Teleop Coral (Allaince Average): {avg_teleop_coral:.1f}\n"
-            f"• Processor Algae (Alliance Average): {avg_processor_algae:.1f}\n"
-            f"• Barge Algae (Alliance Average): {avg_barge_algae:.1f}\n"
+            f"(based on {stats['matches_played']} matches; per-robot estimates from OPR)\n\n"
+            f"• OPR: {stats['opr']:.1f}\n"
+            f"• Auto Coral: {stats['auto_coral']:.1f}\n"
+            f"• Teleop Coral: {stats['teleop_coral']:.1f}\n"
+            f"• Processor Algae: {stats['processor_algae']:.1f}\n"
+            f"• Barge Algae: {stats['barge_algae']:.1f}\n"
+            f"• Barge Points: {stats['barge_points']:.1f}\n"
+            f"• Endgame: Deep {stats['deep_climbs_rate']:.0%}, "
+            f"Shallow {stats['shallow_climbs_rate']:.0%}, Park {stats['parks_rate']:.0%}\n"
         )
 
         return stats_report
@@ -419,48 +647,2530 @@ def generate_last_event_statistics(team_number):
         print(f"💥 Error generating last event statistics: {e}")
         return "⭐ Last Event Statistics not available."
 
+def fetch_team_events(team_number, year=CURRENT_SEASON):
+    # Same URL team_lookup and load event use, so it is usually a cache hit
+    events_response = tba_get(f"/team/frc{team_number}/events/{year}")
+    events_response.raise_for_status()
+    return events_response.json()
+
+def find_last_event(events):
+    """Returns (event, event_index) for the most recent event with matches, or None."""
+    for event in sorted(events, key=lambda e: e.get('end_date') or '', reverse=True):
+        event_index = get_event_match_index(event.get('key'))
+        if event_index and event_index['matches']:
+            return event, event_index
+    return None
+
+def team_event_averages(event_index, team_key):
+    totals = event_index['team_stats'].get(team_key)
+    if not totals or totals['matches_played'] == 0:
+        return None
+    matches_played = totals['matches_played']
+    averages = {key: totals[key] / matches_played for key in EVENT_TOTAL_KEYS}
+    averages['matches_played'] = matches_played
+    return averages
+
+def team_event_contributions(event_index, team_key):
+    """The team's OPR-style contributions plus its own endgame rates at an event."""
+    averages = team_event_averages(event_index, team_key)
+    if not averages:
+        return None
+    stats = dict(event_contributions(event_index).get(team_key, dict.fromkeys(CONTRIBUTION_FIELDS, 0.0)))
+    stats['matches_played'] = averages['matches_played']
+    for endgame in ENDGAME_RESULTS.values():
+        stats[f'{endgame}_rate'] = averages[endgame]
+    return stats
+
+def last_event_contributions(team_number, events=None, year=CURRENT_SEASON):
+    if events is None:
+        events = fetch_team_events(team_number, year)
+    last_event = find_last_event(events or [])
+    if last_event is None:
+        return None
+    event, event_index = last_event
+    stats = team_event_contributions(event_index, f"frc{team_number}")
+    if stats:
+        stats.update(event_key=event.get('key'), event_name=event.get('name', 'Unknown Event'))
+    return stats
+
+# --- Team Index ---
+# "lookup cheesy poofs", "favorite the robonauts" and "note: 8 fast" resolve
+# against a local list of every FRC team (number, nickname, location), built
+# from TBA's paged /teams/{page}/simple in the background and kept on disk in
+# TEAM_INDEX_PATH, so a name costs no upstream calls. Name words match as
+# word prefixes ("cheesy poo"); typos fall back to trigram similarity.
+
+TEAM_INDEX_PATH = os.getenv('TEAM_INDEX_PATH', 'team_index.json')
+TEAM_INDEX_MAX_AGE = 7 * 24 * 3600  # rebuild weekly; rookies appear before the season
+TEAM_INDEX_PAGE_BATCH = 4
+TEAM_SUGGESTIONS = 5
+FUZZY_MIN_SCORE = 0.45
+# Words people type around a team name that aren't part of it
+NAME_FILLER_WORDS = {
+    'a', 'about', 'an', 'fav', 'fave', 'favorite', 'find', 'for', 'frc', 'from', 'info', 'look', 'lookup', 'me',
+    'of', 'on', 'scout', 'show', 'team', 'teams', 'the', 'unfavorite', 'up', 'who',
+}
+TEAM_INDEX_RETRY_SECONDS = 600
+TEAM_INDEX_LEASE_SECONDS = 300  # longest a build may hold the download to itself
+TEAM_INDEX_PEER_WAIT_SECONDS = 60
+
+def name_tokens(text):
+    return [word for word in re.sub(r'[^a-z0-9]+', ' ', text.lower()).split() if word not in NAME_FILLER_WORDS]
+
+def trigrams(tokens):
+    padded = f" {' '.join(tokens)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TeamIndex:
+    """Every team's number, nickname and location, searchable by word prefix and trigram."""
+
+    __slots__ = ('numbers', 'nicknames', 'locations', 'slots', 'words', 'word_slots', 'grams', 'gram_counts',
+                 'name_words', 'built_at')
+
+    def __init__(self, teams, built_at):
+        teams = sorted(teams, key=lambda team: team[0])
+        self.numbers = [number for number, *_ in teams]
+        self.nicknames = [nickname or f"Team {number}" for number, nickname, *_ in teams]
+        self.locations = [', '.join(part for part in place if part) for _, _, *place in teams]
+        self.slots = {number: slot for slot, number in enumerate(self.numbers)}
+        self.built_at = built_at
+
+        # Sorted (word, slot, in_nickname) entries: a prefix is one bisect away
+        entries = []
+        self.name_words = []
+        self.grams = {}
+        self.gram_counts = []
+        for slot, (nickname, location) in enumerate(zip(self.nicknames, self.locations)):
+            words = name_tokens(nickname)
+            self.name_words.append(words)
+            entries += [(word, slot, True) for word in set(words)]
+            entries += [(word, slot, False) for word in set(name_tokens(location)) - set(words)]
+            grams = trigrams(words)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.grams.setdefault(gram, []).append(slot)
+        entries.sort()
+        self.words = [word for word, _, _ in entries]
+        self.word_slots = [(slot, in_nickname) for _, slot, in_nickname in entries]
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def __contains__(self, number):
+        return number in self.slots
+
+    def describe(self, number):
+        slot = self.slots[number]
+        return f"{number} {self.nicknames[slot]}" + (f" ({self.locations[slot]})" if self.locations[slot] else "")
+
+    def prefix_matches(self, word):
+        start = bisect.bisect_left(self.words, word)
+        end = bisect.bisect_left(self.words, word + '\x7f', start)
+        return self.word_slots[start:end]
+
+    def search(self, query, fuzzy=True):
+        """Ranked [(score, team_number)]. Every word must start a word of the team's nickname or location."""
+        words = name_tokens(query)
+        if not words:
+            return []
+
+        # slot -> [words found in the nickname, words found only in the location]
+        hits = None
+        for word in words:
+            found = {}
+            for slot, in_nickname in self.prefix_matches(word):
+                found[slot] = found.get(slot, False) or in_nickname
+            if hits is None:
+                hits = {slot: [in_nickname] for slot, in_nickname in found.items()}
+            else:
+                hits = {slot: hits[slot] + [found[slot]] for slot in found if slot in hits}
+            if not hits:
+                break
+
+        scored = []
+        for slot, matched in (hits or {}).items():
+            in_nickname = sum(matched)
+            score = (2 * in_nickname + 1.5 * (len(words) - in_nickname)) / len(words)
+            if in_nickname == len(words):
+                # Prefer the nickname the query covers most of, and exact names most of all
+                score += 0.25 * len(''.join(words)) / max(len(''.join(self.name_words[slot])), 1)
+                score += 0.5 * (words == self.name_words[slot])
+            scored.append((score, self.numbers[slot]))
+
+        if not scored and fuzzy:
+            query_grams = trigrams(words)
+            shared = {}
+            for gram in query_grams:
+                for slot in self.grams.get(gram, ()):
+                    shared[slot] = shared.get(slot, 0) + 1
+            for slot, count in shared.items():
+                score = 2 * count / (len(query_grams) + self.gram_counts[slot])
+                if score >= FUZZY_MIN_SCORE:
+                    scored.append((score, self.numbers[slot]))
+
+        scored.sort(key=lambda match: (-match[0], match[1]))
+        return scored
+
+    def exact_match(self, query):
+        """The team whose whole nickname is query, if exactly one team has it."""
+        words = name_tokens(query)
+        if not words:
+            return None
+        slots = {slot for slot, in_nickname in self.prefix_matches(words[0]) if in_nickname}
+        matches = [self.numbers[slot] for slot in slots if self.name_words[slot] == words]
+        return matches[0] if len(matches) == 1 else None
+
+    def best_match(self, query, fuzzy=True):
+        """(team_number, suggestions): the number when one team clearly wins, else the closest few."""
+        matches = self.search(query, fuzzy)
+        if matches and (len(matches) == 1 or matches[0][0] - matches[1][0] >= 0.15):
+            return matches[0][1], []
+        return None, [number for _, number in matches[:TEAM_SUGGESTIONS]]
+
+_team_index = None
+_team_index_mtime = None
+_team_index_lock = threading.Lock()
+_team_index_building = False
+_team_index_retry_at = 0
+
+def get_team_index():
+    """The on-disk team index (reloaded if another worker rebuilt it), or None until the first build finishes."""
+    global _team_index, _team_index_mtime
+    try:
+        mtime = os.path.getmtime(TEAM_INDEX_PATH)
+    except OSError:
+        mtime = None
+
+    if mtime != _team_index_mtime:
+        with _team_index_lock:
+            if mtime != _team_index_mtime:
+                try:
+                    with open(TEAM_INDEX_PATH) as f:
+                        data = json.load(f)
+                    _team_index = TeamIndex(data['teams'], data['built_at'])
+                except (OSError, ValueError, KeyError):
+                    _team_index = None
+                _team_index_mtime = mtime
+
+    if (_team_index is None or time.time() - _team_index.built_at > TEAM_INDEX_MAX_AGE) and active_snapshot() is None:
+        start_team_index_build()
+    return _team_index
+
+def start_team_index_build():
+    global _team_index_building
+    with _team_index_lock:
+        if _team_index_building or time.time() < _team_index_retry_at:
+            return
+        _team_index_building = True
+    threading.Thread(target=build_team_index, name='team-index', daemon=True).start()
+
+def build_team_index():
+    global _team_index_building, _team_index_retry_at
+    started = time.monotonic()
+    owner = None
+    try:
+        # One worker downloads the pages; the others pick up its file by mtime
+        owner = acquire_fetch_lease('team-index', seconds=TEAM_INDEX_LEASE_SECONDS)
+        if owner is None:
+            _team_index_retry_at = time.time() + TEAM_INDEX_PEER_WAIT_SECONDS
+            return
+        try:
+            if time.time() - os.path.getmtime(TEAM_INDEX_PATH) < TEAM_INDEX_MAX_AGE:
+                return  # Another worker finished a build since we looked
+        except OSError:
+            pass
+
+        teams = []
+        page = 0
+        while True:
+            batch = [upstream_pool.submit(tba_get, f"/teams/{page + i}/simple") for i in range(TEAM_INDEX_PAGE_BATCH)]
+            pages = [future.result() for future in batch]
+            for response in pages:
+                response.raise_for_status()
+                teams += [
+                    [team['team_number'], team.get('nickname'), team.get('city'), team.get('state_prov'), team.get('country')]
+                    for team in response.json() or []
+                ]
+            if not all(response.json() for response in pages):
+                break
+            page += TEAM_INDEX_PAGE_BATCH
+
+        temp_path = f"{TEAM_INDEX_PATH}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'built_at': time.time(), 'teams': teams}, f)
+        os.replace(temp_path, TEAM_INDEX_PATH)
+        print(f"🗂️ Team index built: {len(teams)} teams in {time.monotonic() - started:.1f}s")
+    except Exception as e:
+        print(f"⚠️ Couldn't build the team index, retrying in {TEAM_INDEX_RETRY_SECONDS}s: {e}")
+        _team_index_retry_at = time.time() + TEAM_INDEX_RETRY_SECONDS
+    finally:
+        if owner is not None:
+            get_cache_db().execute('DELETE FROM fetch_leases WHERE url = ? AND owner = ?', ('team-index', owner))
+        with _team_index_lock:
+            _team_index_building = False
+
+def resolve_team(text):
+    """
+    (team_number, suggestions) for free text: a 3+ digit number as before, a
+    1-2 digit number (alone or beside a season), or a team name or city. When
+    a name fits several teams, team_number is None and suggestions lists the
+    closest ones.
+    """
+    words = [word for word in name_tokens(text) if not word.isdigit()]
+    team_number = extract_team_number(text)
+    short = [num for num in ''.join(c if c.isdigit() else ' ' for c in text).split() if len(num) <= 2]
+    season_like = team_number and FIRST_SEASON <= int(team_number) <= CURRENT_SEASON
+    # "cheesy poofs 2024" and "8 2024" name a team and a season, not team 2024
+    if team_number and not (season_like and (words or short)):
+        return team_number, []
+
+    index = get_team_index()
+    if short and season_like and (index is None or int(short[0]) in index):
+        return str(int(short[0])), []
+    if words and index is not None:
+        match, suggestions = index.best_match(' '.join(words))
+        # A season-like number stays the team number unless the words name exactly one team ("2056 auto")
+        if match or not team_number:
+            return (str(match) if match else None), suggestions
+    if team_number:
+        return team_number, []
+
+    if short and not words and (index is None or int(short[0]) in index):
+        return str(int(short[0])), []
+    return None, []
+
+def split_team_prefix(text, max_words=4):
+    """
+    (team_number, rest) when text starts with a 1-2 digit team number, a name
+    the user marked with a colon ("poofs: great climber"), or a team's full
+    nickname ("cheesy poofs great climber"), else (None, text). An unmarked
+    word that only starts a nickname ("great climber") names no team.
+    """
+    words = text.split()
+    index = get_team_index()
+    if words and words[0].rstrip(':').isdigit() and (index is None or int(words[0].rstrip(':')) in index):
+        return str(int(words[0].rstrip(':'))), ' '.join(words[1:])
+    if index is None:
+        return None, text
+
+    name, colon, rest = text.partition(':')
+    if colon and 0 < len(name.split()) <= max_words:
+        match, _ = index.best_match(name, fuzzy=False)
+        return (str(match), rest.strip()) if match else (None, text)
+
+    for count in range(min(max_words, len(words)), 0, -1):
+        match = index.exact_match(' '.join(words[:count]))
+        if match:
+            return str(match), ' '.join(words[count:])
+    return None, text
+
+def team_suggestions_reply(suggestions, fallback):
+    if not suggestions:
+        if get_team_index() is None:
+            fallback += " (Team names work once the team list finishes downloading.)"
+        return fallback
+    index = get_team_index()
+    return "🤔 Which team did you mean?\n" + "\n".join(f"• {index.describe(number)}" for number in suggestions)
+
+# --- Event Match Store ---
+# Each event's /matches payload is parsed once per version (ETag) and indexed
+# by team, with per-team totals precomputed, so every team at that event is
+# answered from memory until TBA reports the matches changed.
+
+# The game whose score_breakdown keys ENDGAME_RESULTS and CONTRIBUTION_FIELDS name
+BREAKDOWN_SEASON = 2025
+
+ENDGAME_RESULTS = {
+    'DeepCage': 'deep_climbs',
+    'ShallowCage': 'shallow_climbs',
+    'Parked': 'parks',
+}
+EVENT_TOTAL_KEYS = (
+    'matches_played', 'auto_coral', 'teleop_coral', 'processor_algae', 'barge_algae',
+    'deep_climbs', 'shallow_climbs', 'parks',
+)
+
+# Least recently used first; capped so past seasons and picklists don't pile up
+EVENT_STORE_MAX_EVENTS = 32
+EVENT_STORE_EXPIRED_SECONDS = 6 * 3600  # drop indexes this long past expiry even under the cap
+
+event_match_store = OrderedDict()
+_event_store_lock = threading.Lock()
+
+def get_event_match_index(event_key):
+    entry = event_match_store.get(event_key)
+    if entry and event_index_fresh(entry):
+        with _event_store_lock:
+            if event_key in event_match_store:
+                event_match_store.move_to_end(event_key)
+        apply_webhook_matches(entry, event_key)
+        return entry
+
+    # Concurrent lookups at the same event share one parse
+    return single_flight(f"event-index:{event_key}", lambda: refresh_event_match_index(event_key))
+
+def event_index_fresh(entry):
+    # While TBA webhooks keep an event current, trust it until WEBHOOK_RESYNC_SECONDS after the last one
+    now = time.time()
+    return entry['expires_at'] > now or entry.get('webhook_at', 0) + WEBHOOK_RESYNC_SECONDS > now
+
+def refresh_event_match_index(event_key):
+    entry = event_match_store.get(event_key)
+    if entry and event_index_fresh(entry):
+        apply_webhook_matches(entry, event_key)
+        return entry
+
+    response = tba_get(f"/event/{event_key}/matches")
+    if response.status_code != 200:
+        return entry
+
+    version = response.etag or response.last_modified or hashlib.sha1(response.content).hexdigest()
+    if entry and entry['version'] == version:
+        entry['expires_at'] = response.expires_at
+        apply_webhook_matches(entry, event_key)
+        return entry
+
+    entry = build_event_match_index(response.json())
+    entry['version'] = version
+    entry['expires_at'] = response.expires_at
+    # Webhook matches may be newer than the payload; replaying them is idempotent
+    apply_webhook_matches(entry, event_key)
+    store_event_match_index(event_key, entry)
+    return entry
+
+def store_event_match_index(event_key, entry):
+    with _event_store_lock:
+        event_match_store[event_key] = entry
+        event_match_store.move_to_end(event_key)
+        cutoff = time.time() - EVENT_STORE_EXPIRED_SECONDS
+        for stale_key in [key for key, stored in event_match_store.items()
+                          if key != event_key
+                          and max(stored['expires_at'], stored.get('webhook_at', 0) + WEBHOOK_RESYNC_SECONDS) < cutoff]:
+            del event_match_store[stale_key]
+        while len(event_match_store) > EVENT_STORE_MAX_EVENTS:
+            event_match_store.popitem(last=False)
+
+def build_event_match_index(matches):
+    # The lock guards webhook replays and the contribution solve against each other
+    entry = {'matches': [], 'match_positions': {}, 'team_stats': {}, 'lock': threading.Lock()}
+    for match in matches:
+        apply_match(entry, match)
+    return entry
+
+def apply_match(entry, match):
+    """Adds a match to an event index, or replaces an earlier copy of it, updating running totals."""
+    match_key = match.get('key')
+    position = entry['match_positions'].get(match_key)
+
+    if position is None:
+        entry['match_positions'][match_key] = len(entry['matches'])
+        entry['matches'].append(match)
+    else:
+        old_match = entry['matches'][position]
+        entry['matches'][position] = match
+        add_match_totals(entry['team_stats'], old_match, -1)
+
+    add_match_totals(entry['team_stats'], match, 1)
+    entry.pop('contributions', None)  # Re-solved on next use
+
+def add_match_totals(team_stats, match, sign):
+    alliances = match.get('alliances', {})
+    score_breakdown = match.get('score_breakdown') or {}
+
+    for color in ('red', 'blue'):
+        breakdown = score_breakdown.get(color) or {}
+        if not breakdown:
+            continue  # Not played yet
+        team_keys = alliances.get(color, {}).get('team_keys', [])
+
+        for position, team_key in enumerate(team_keys, 1):
+            totals = team_stats.setdefault(team_key, dict.fromkeys(EVENT_TOTAL_KEYS, 0))
+            totals['matches_played'] += sign
+            totals['auto_coral'] += sign * breakdown.get('autoCoralCount', 0)
+            totals['teleop_coral'] += sign * breakdown.get('teleopCoralCount', 0)
+            totals['processor_algae'] += sign * breakdown.get('wallAlgaeCount', 0)
+            totals['barge_algae'] += sign * breakdown.get('netAlgaeCount', 0)
+
+            # endGameRobotN is the robot in team_keys position N
+            endgame = ENDGAME_RESULTS.get(breakdown.get(f'endGameRobot{position}'))
+            if endgame:
+                totals[endgame] += sign
+
+# --- TBA Webhooks ---
+# match_score notifications are stored in the shared cache database and folded
+# into each worker's event index the next time it is read, so stats update
+# within a second of a match posting without re-downloading the event.
+
+TBA_WEBHOOK_SECRET = os.getenv('TBA_WEBHOOK_SECRET')
+WEBHOOK_RESYNC_SECONDS = 15 * 60
+
+@app.route('/webhooks/tba', methods=['POST'])
+def tba_webhook():
+    if not TBA_WEBHOOK_SECRET:
+        return jsonify({'error': 'TBA webhooks are not configured'}), 404
+
+    body = request.get_data()
+    expected = hmac.new(TBA_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, request.headers.get('X-TBA-HMAC', '')):
+        return jsonify({'error': 'bad signature'}), 401
+
+    try:
+        message = json.loads(body)
+    except ValueError:
+        return jsonify({'error': 'body is not valid JSON'}), 400
+    if not isinstance(message, dict):
+        return jsonify({'error': 'body must be a JSON object'}), 400
+    message_type = message.get('message_type')
+    message_data = message.get('message_data') or {}
+    if not isinstance(message_data, dict):
+        return jsonify({'error': 'message_data must be a JSON object'}), 400
+
+    if message_type == 'verification':
+        print(f"🔑 TBA webhook verification key: {message_data.get('verification_key')}")
+    elif message_type == 'match_score':
+        if not webhook_match_valid(message_data.get('match') or {}):
+            return jsonify({'error': 'match, its alliances and score breakdowns must be JSON objects'}), 400
+        ingest_webhook_match(message_data)
+    elif message_type == 'upcoming_match':
+        # Those teams are about to be looked up; get their data fresh first
+        team_keys = message_data.get('team_keys') or []
+        if not isinstance(team_keys, list) or not all(isinstance(team_key, str) for team_key in team_keys):
+            return jsonify({'error': 'team_keys must be a list of team keys'}), 400
+        for team_key in team_keys:
+            for url in team_refresh_urls(team_key[3:]):
+                queue_refresh(url, REFRESH_RECENT)
+
+    return jsonify({'ok': True})
+
+def webhook_match_valid(match):
+    # Stored matches are replayed on every read of the event, so a bad shape must never get in
+    if not isinstance(match, dict):
+        return False
+    for field in ('alliances', 'score_breakdown'):
+        sides = match.get(field) or {}
+        if not isinstance(sides, dict) or not all(isinstance(side, dict) for side in sides.values() if side):
+            return False
+    return True
+
+def ingest_webhook_match(message_data):
+    match = message_data.get('match') or {}
+    event_key = message_data.get('event_key') or match.get('event_key')
+    match.setdefault('key', message_data.get('match_key'))
+    if not isinstance(event_key, str) or not isinstance(match.get('key'), str):
+        return
+
+    # Older payloads list alliance teams under "teams" rather than "team_keys"
+    for alliance in (match.get('alliances') or {}).values():
+        if 'team_keys' not in alliance and 'teams' in alliance:
+            alliance['team_keys'] = alliance['teams']
+
+    get_cache_db().execute(
+        'INSERT INTO webhook_matches (event_key, match_key, body, received_at) VALUES (?, ?, ?, ?)',
+        (event_key, match['key'], json.dumps(match), time.time())
+    )
+    entry = event_match_store.get(event_key)
+    if entry:
+        apply_webhook_matches(entry, event_key)
+
+def apply_webhook_matches(entry, event_key):
+    with entry['lock']:
+        rows = get_cache_db().execute(
+            'SELECT id, body, received_at FROM webhook_matches WHERE event_key = ? AND id > ? ORDER BY id',
+            (event_key, entry.get('webhook_seq', 0))
+        ).fetchall()
+        for row_id, body, received_at in rows:
+            apply_match(entry, json.loads(body))
+            entry['webhook_seq'] = row_id
+            entry['webhook_at'] = received_at
+
+# --- Contribution Engine ---
+# Alliance breakdowns only say what three robots scored together. Solving the
+# alliance-appearance x team system by least squares (OPR) splits every
+# breakdown field into per-team contributions in one batched solve per event,
+# cached on the event's match index until its matches change.
+
+# contribution -> breakdown fields summed per alliance
+CONTRIBUTION_FIELDS = {
+    'opr': ('totalPoints',),
+    'auto_points': ('autoPoints',),
+    'teleop_points': ('teleopPoints',),
+    'auto_coral': ('autoCoralCount',),
+    'teleop_coral': ('teleopCoralCount',),
+    'coral_points': ('autoCoralPoints', 'teleopCoralPoints'),
+    'processor_algae': ('wallAlgaeCount',),
+    'barge_algae': ('netAlgaeCount',),
+    'algae_points': ('algaePoints',),
+    'barge_points': ('endGameBargePoints',),
+}
+
+def event_contributions(event_index):
+    contributions = event_index.get('contributions')
+    if contributions is None:
+        with event_index['lock']:
+            contributions = event_index.get('contributions')
+            if contributions is None:
+                contributions = solve_contributions(event_index['matches'])
+                event_index['contributions'] = contributions
+    return contributions
+
+def solve_contributions(matches):
+    played = [match for match in matches if match.get('score_breakdown')]
+    # Quals give the most varied alliances; fall back to everything before they're played
+    played = [match for match in played if match.get('comp_level') == 'qm'] or played
+
+    team_column = {}
+    rows, columns, scores = [], [], []
+    for match in played:
+        for color in ('red', 'blue'):
+            team_keys = match.get('alliances', {}).get(color, {}).get('team_keys', [])
+            breakdown = match['score_breakdown'].get(color) or {}
+            if not team_keys or not breakdown:
+                continue
+
+            row = len(scores)
+            for team_key in team_keys:
+                rows.append(row)
+                columns.append(team_column.setdefault(team_key, len(team_column)))
+            scores.append([
+                sum(value for value in (breakdown.get(field) for field in fields) if isinstance(value, (int, float)))
+                for fields in CONTRIBUTION_FIELDS.values()
+            ])
+
+    if not scores:
+        return {}
+
+    appearances = np.zeros((len(scores), len(team_column)))
+    appearances[rows, columns] = 1.0
+    solution, *_ = np.linalg.lstsq(appearances, np.asarray(scores, dtype=float), rcond=None)
+
+    names = list(CONTRIBUTION_FIELDS)
+    return {
+        team_key: dict(zip(names, solution[column].tolist()))
+        for team_key, column in team_column.items()
+    }
+
+# --- Season Match Store ---
+# A whole season of score breakdowns as raw TBA dicts runs to gigabytes. The
+# store keeps one row per alliance per played match in NumPy columns: team
+# and event keys interned to small ints, breakdown fields as float32 and
+# endgame results as int8 codes. Rows are grouped by event, and a sorted
+# index over team slots gives each team's rows as one slice.
+
+SEASON_FIELDS = list(dict.fromkeys(field for fields in CONTRIBUTION_FIELDS.values() for field in fields))
+ENDGAME_CODES = {result: code for code, result in enumerate(ENDGAME_RESULTS, 1)}
+COMP_LEVELS = ['qm', 'ef', 'qf', 'sf', 'f']
+ALLIANCE_SIZE = 3
+
+class SeasonMatchStore:
+    __slots__ = (
+        'team_keys', 'team_ids', 'event_keys', 'event_ids', 'field_index',
+        'event', 'comp_level', 'teams', 'values', 'endgame',
+        'event_bounds', 'team_slots', 'team_bounds',
+    )
+
+    def __init__(self, payloads):
+        """payloads: {event_key: that event's /matches response}."""
+        self.team_ids = {}
+        self.event_ids = {}
+        self.field_index = {field: i for i, field in enumerate(SEASON_FIELDS)}
+        events, levels, teams, values, endgames = [], [], [], [], []
+
+        for event_key in sorted(payloads):
+            event_id = self.event_ids.setdefault(sys.intern(event_key), len(self.event_ids))
+            for match in payloads[event_key] or []:
+                level = COMP_LEVELS.index(match['comp_level']) if match.get('comp_level') in COMP_LEVELS else 0
+                for color in ('red', 'blue'):
+                    breakdown = (match.get('score_breakdown') or {}).get(color)
+                    team_keys = match.get('alliances', {}).get(color, {}).get('team_keys', [])[:ALLIANCE_SIZE]
+                    if not breakdown or not team_keys:
+                        continue  # Not played yet
+                    ids = [self.team_ids.setdefault(sys.intern(key), len(self.team_ids)) for key in team_keys]
+                    events.append(event_id)
+                    levels.append(level)
+                    teams.append(ids + [-1] * (ALLIANCE_SIZE - len(ids)))
+                    values.append([breakdown.get(field) if isinstance(breakdown.get(field), (int, float)) else np.nan
+                                   for field in SEASON_FIELDS])
+                    endgames.append([ENDGAME_CODES.get(breakdown.get(f'endGameRobot{position}'), 0)
+                                     for position in range(1, ALLIANCE_SIZE + 1)])
+
+        self.team_keys = list(self.team_ids)
+        self.event_keys = list(self.event_ids)
+        self.event = np.array(events, dtype=np.int32)
+        self.comp_level = np.array(levels, dtype=np.int8)
+        self.teams = np.array(teams, dtype=np.int32).reshape(-1, ALLIANCE_SIZE)
+        self.values = np.array(values, dtype=np.float32).reshape(-1, len(SEASON_FIELDS))
+        self.endgame = np.array(endgames, dtype=np.int8).reshape(-1, ALLIANCE_SIZE)
+
+        # Rows are already in event order; team slots (row * 3 + position) sorted by team
+        self.event_bounds = np.searchsorted(self.event, np.arange(len(self.event_keys) + 1))
+        slots = np.flatnonzero(self.teams.ravel() >= 0)
+        slot_teams = self.teams.ravel()[slots]
+        order = np.argsort(slot_teams, kind='stable')
+        self.team_slots = slots[order].astype(np.int32)
+        self.team_bounds = np.searchsorted(slot_teams[order], np.arange(len(self.team_keys) + 1))
+
+    def __len__(self):
+        return len(self.event)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in (
+            'event', 'comp_level', 'teams', 'values', 'endgame', 'event_bounds', 'team_slots', 'team_bounds'))
+
+    def event_rows(self, event_key):
+        event_id = self.event_ids.get(event_key)
+        if event_id is None:
+            return slice(0, 0)
+        return slice(self.event_bounds[event_id], self.event_bounds[event_id + 1])
+
+    def team_rows(self, team_key):
+        """(alliance rows, position in each alliance) for every match the team played."""
+        team_id = self.team_ids.get(team_key)
+        if team_id is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        slots = self.team_slots[self.team_bounds[team_id]:self.team_bounds[team_id + 1]]
+        return slots // ALLIANCE_SIZE, slots % ALLIANCE_SIZE
+
+    def column(self, field):
+        return self.values[:, self.field_index[field]]
+
+    def team_means(self, field):
+        """Every team's average alliance value of one field, indexed by team id, in one pass."""
+        team_of_slot = self.teams.ravel()[self.team_slots]
+        values = self.column(field)[self.team_slots // ALLIANCE_SIZE]
+        played = ~np.isnan(values)
+        sums = np.bincount(team_of_slot[played], weights=values[played], minlength=len(self.team_keys))
+        counts = np.bincount(team_of_slot[played], minlength=len(self.team_keys))
+        return sums / np.maximum(counts, 1)
+
+    def team_summary(self, team_key):
+        rows, positions = self.team_rows(team_key)
+        if not len(rows):
+            return None
+        values = self.values[rows]
+        counts = (~np.isnan(values)).sum(axis=0)
+        totals = np.nansum(values, axis=0)
+        endgame = self.endgame[rows, positions]
+        summary = {
+            'matches_played': int(len(rows)),
+            'events': [self.event_keys[event_id] for event_id in np.unique(self.event[rows])],
+            'alliance_averages': {
+                field: round(float(total / count), 2)
+                for field, total, count in zip(SEASON_FIELDS, totals, counts) if count
+            },
+        }
+        for result, code in ENDGAME_CODES.items():
+            summary[f'{ENDGAME_RESULTS[result]}_rate'] = round(float(np.mean(endgame == code)), 3)
+        return summary
+
+season_stores = {}
+_season_rebuilding = set()
+_season_rebuild_lock = threading.Lock()
+
+# /event/2025nyro/matches: a payload that feeds the season store
+SEASON_MATCHES_PATH = re.compile(r'^/event/(\d{4})[a-z0-9]+/matches$')
+
+def season_matches_version(year):
+    # Bumped by fetch_upstream only when a new 200 body is stored; 304s leave it alone
+    row = get_cache_db().execute('SELECT value FROM app_state WHERE key = ?', (f'season_matches:{year}',)).fetchone()
+    return int(row[0]) if row else 0
+
+def bump_season_matches_version(url):
+    match = SEASON_MATCHES_PATH.match(upstream_service(url)[1])
+    if match:
+        get_cache_db().execute(
+            "INSERT INTO app_state (key, value) VALUES (?, '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+            (f'season_matches:{match.group(1)}',)
+        )
+
+def season_match_store(year=CURRENT_SEASON):
+    """
+    The season's store, built from every /event/<key>/matches payload already in
+    the response cache (no upstream calls). When new payloads land it is
+    rebuilt in the background; callers keep the previous store until then.
+    """
+    cached = season_stores.get(year)
+    if cached is None:
+        return single_flight(f"season-store:{year}", lambda: build_season_match_store(year))
+    if cached[0] != season_matches_version(year):
+        rebuild_season_match_store(year)
+    return cached[1]
+
+def rebuild_season_match_store(year):
+    with _season_rebuild_lock:
+        if year in _season_rebuilding:
+            return
+        _season_rebuilding.add(year)
+
+    def rebuild():
+        try:
+            build_season_match_store(year)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            with _season_rebuild_lock:
+                _season_rebuilding.discard(year)
+
+    threading.Thread(target=rebuild, name=f'season-store-{year}', daemon=True).start()
+
+def build_season_match_store(year):
+    # Read the version first: a payload stored mid-build bumps it again and triggers another rebuild
+    version = season_matches_version(year)
+    prefix = f"{TBA_API_BASE}/event/"
+    rows = get_cache_db().execute(
+        "SELECT url, body FROM http_cache WHERE url >= ? AND url < ? AND url LIKE '%/matches' AND status = 200",
+        (f"{prefix}{year}", f"{prefix}{year + 1}")
+    )
+    payloads = {
+        url[len(prefix):-len('/matches')]: json.loads(body)
+        for url, body in rows if url.endswith('/matches') and '/' not in url[len(prefix):-len('/matches')]
+    }
+    store = SeasonMatchStore(payloads)
+    season_stores[year] = (version, store)
+    return store
+
+# --- Team Comparison ---
+
+# (label, metric, higher is better)
+COMPARE_ROWS = [
+    ('EPA', 'epa', True),
+    ('EPA Rank', 'epa_rank', False),
+    ('Auto EPA', 'auto_epa', True),
+    ('Teleop EPA', 'teleop_epa', True),
+    ('Coral Pts', 'coral_points', True),
+    ('Algae Pts', 'algae_points', True),
+    ('Barge Pts', 'barge_points', True),
+    ('OPR*', 'opr', True),
+    ('Auto Coral*', 'auto_coral', True),
+    ('Teleop Coral*', 'teleop_coral', True),
+    ('Proc. Algae*', 'processor_algae', True),
+    ('Barge Algae*', 'barge_algae', True),
+    ('Best Rank', 'best_rank', False),
+    ('Events Won', 'events_won', True),
+]
+COMPARE_MAX_TEAMS = 6
+
+def extract_team_numbers(text):
+    numbers = ''.join(c if c.isdigit() else ' ' for c in text).split()
+    return list(dict.fromkeys(num for num in numbers if len(num) >= 3))
+
+def compare_teams(user_input):
+    team_numbers = extract_team_numbers(user_input)
+    if not 2 <= len(team_numbers) <= COMPARE_MAX_TEAMS:
+        return jsonify({'reply': f"⚠️ Please list 2 to {COMPARE_MAX_TEAMS} teams to compare, e.g. 'compare 1507 254 1114'."})
+
+    # One concurrent batch for every team; cached data (e.g. after 'load event') is reused
+    started = time.monotonic()
+    futures = {
+        team_number: (
+            upstream_pool.submit(fetch_statbotics_info, team_number),
+            upstream_pool.submit(tba_get, f"/team/frc{team_number}/events/{CURRENT_SEASON}/statuses"),
+            upstream_pool.submit(last_event_contributions, team_number),
+        )
+        for team_number in team_numbers
+    }
+    metrics = {
+        team_number: compare_metrics(*futures[team_number], started)
+        for team_number in team_numbers
+    }
+
+    return jsonify({'reply': format_comparison(team_numbers, metrics), 'format': 'table'})
+
+def compare_metrics(statbotics_future, statuses_future, last_event_future, started):
+    statbotics_info = section_result(statbotics_future, started, 'statbotics', None) or {}
+    statuses_response = section_result(statuses_future, started, 'events', None)
+    last_event = section_result(last_event_future, started, 'last_event', None) or {}
+
+    epa_data = statbotics_info.get('epa', {})
+    breakdown = epa_data.get('breakdown', {})
+
+    def total(*keys):
+        values = [breakdown.get(key) for key in keys]
+        return sum(values) if all(isinstance(v, (int, float)) for v in values) else None
+
+    events_info = statuses_response.json() if statuses_response is not None and statuses_response.status_code == 200 else {}
+    statuses = [info for info in events_info.values() if info]
+    ranks = [
+        info.get('qual', {}).get('ranking', {}).get('rank')
+        for info in statuses if (info.get('qual') or {}).get('ranking')
+    ]
+
+    return {
+        'epa': epa_data.get('total_points', {}).get('mean'),
+        'epa_rank': epa_data.get('ranks', {}).get('total', {}).get('rank'),
+        'auto_epa': breakdown.get('auto_points'),
+        'teleop_epa': breakdown.get('teleop_points'),
+        'coral_points': total('auto_coral_points', 'teleop_coral_points'),
+        'algae_points': total('processor_algae_points', 'net_algae_points'),
+        'barge_points': breakdown.get('barge_points'),
+        'opr': last_event.get('opr'),
+        'auto_coral': last_event.get('auto_coral'),
+        'teleop_coral': last_event.get('teleop_coral'),
+        'processor_algae': last_event.get('processor_algae'),
+        'barge_algae': last_event.get('barge_algae'),
+        'best_rank': min((rank for rank in ranks if rank), default=None),
+        'events_won': sum(1 for info in statuses if (info.get('playoff') or {}).get('status') == 'won') if statuses else None,
+    }
+
+def format_comparison(team_numbers, metrics):
+    label_width = 14
+    column_width = 9
+    lines = [
+        "📊 Team Comparison (★ = best)",
+        "".ljust(label_width) + "".join(team_number.rjust(column_width) for team_number in team_numbers),
+    ]
+
+    for label, metric, higher_is_better in COMPARE_ROWS:
+        values = [metrics[team_number][metric] for team_number in team_numbers]
+        present = [value for value in values if isinstance(value, (int, float))]
+        best = None
+        if len(set(present)) > 1:
+            best = max(present) if higher_is_better else min(present)
+
+        cells = []
+        for value in values:
+            if not isinstance(value, (int, float)):
+                cell = "-"
+            elif isinstance(value, float):
+                cell = f"{value:.1f}"
+            else:
+                cell = str(value)
+            if best is not None and value == best:
+                cell += "★"
+            cells.append(cell.rjust(column_width))
+        lines.append(label.ljust(label_width) + "".join(cells))
+
+    lines.append("\n* Most recent event, per-robot estimate from OPR")
+    return "\n".join(lines)
+
+# --- Picklist ---
+# "picklist 2025nyro by climb" ranks every team at an event. The event's
+# Statbotics and match data are loaded once into a team x column matrix and
+# standardized; each metric is a weight vector over those columns, so
+# re-ranking by another metric is one matrix-vector product.
+
+PICKLIST_SIZE = 24
+PICKLIST_TTL = 120  # seconds a loaded board is reused while the event's matches are unchanged
+
+PICKLIST_COLUMNS = [
+    'epa', 'epa_auto', 'epa_teleop', 'epa_coral', 'epa_algae', 'epa_barge',
+    'opr', 'auto_points', 'teleop_points', 'coral_points', 'algae_points', 'barge_points',
+    'deep_climbs_rate', 'shallow_climbs_rate', 'parks_rate',
+]
+
+# metric -> (column weights, columns shown as (label, column, format))
+PICKLIST_METRICS = {
+    'epa': ({'epa': 0.7, 'opr': 0.3},
+            [('EPA', 'epa', '{:.1f}'), ('OPR', 'opr', '{:.1f}')]),
+    'auto': ({'epa_auto': 0.6, 'auto_points': 0.4},
+             [('AutoEPA', 'epa_auto', '{:.1f}'), ('AutoPts', 'auto_points', '{:.1f}')]),
+    'teleop': ({'epa_teleop': 0.6, 'teleop_points': 0.4},
+               [('TeleEPA', 'epa_teleop', '{:.1f}'), ('TelePts', 'teleop_points', '{:.1f}')]),
+    'coral': ({'epa_coral': 0.5, 'coral_points': 0.5},
+              [('CoralEPA', 'epa_coral', '{:.1f}'), ('CoralPts', 'coral_points', '{:.1f}')]),
+    'algae': ({'epa_algae': 0.5, 'algae_points': 0.5},
+              [('AlgaeEPA', 'epa_algae', '{:.1f}'), ('AlgaePts', 'algae_points', '{:.1f}')]),
+    'barge': ({'epa_barge': 0.5, 'barge_points': 0.5},
+              [('BargeEPA', 'epa_barge', '{:.1f}'), ('BargePts', 'barge_points', '{:.1f}')]),
+    'climb': ({'deep_climbs_rate': 0.6, 'shallow_climbs_rate': 0.25, 'epa_barge': 0.15},
+              [('Deep', 'deep_climbs_rate', '{:.0%}'), ('Shallow', 'shallow_climbs_rate', '{:.0%}')]),
+}
+
+picklist_boards = {}
+
+def picklist(user_input):
+    event_key = extract_event_key(user_input) or current_event()
+    if not event_key:
+        return jsonify({'reply': "⚠️ Please include an event key, e.g. 'picklist 2025nyro by climb'."})
+
+    metric_match = re.search(r'\bby\s+(\w+)', user_input.lower())
+    metric = metric_match.group(1) if metric_match else 'epa'
+    if metric not in PICKLIST_METRICS:
+        return jsonify({'reply': f"⚠️ I can rank by {', '.join(PICKLIST_METRICS)}, e.g. 'picklist {event_key} by climb'."})
+    size_match = re.search(r'\b(?:top\s*)?(\d{1,2})\b', re.sub(r'\d{4}[a-z][a-z0-9]*', '', user_input.lower()))
+    size = max(int(size_match.group(1)), 1) if size_match else PICKLIST_SIZE
+
+    board = get_picklist_board(event_key)
+    if board is None:
+        return jsonify({'reply': f"Sorry, I couldn't find event {event_key}. Please double check the key."})
+
+    started = time.perf_counter()
+    order, scores = rank_picklist(board, metric, size)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    favorites = set(load_favorites())
+    note_counts = dict(get_scout_db().execute('SELECT team, COUNT(*) FROM notes GROUP BY team').fetchall())
+    return jsonify({
+        'reply': format_picklist(board, metric, order, scores, favorites, note_counts, elapsed_ms),
+        'format': 'table',
+    })
+
+def get_picklist_board(event_key):
+    event_index = event_match_store.get(event_key)
+    version = (event_index['version'], event_index.get('webhook_seq', 0)) if event_index else None
+    board = picklist_boards.get(event_key)
+    if board and time.monotonic() - board['loaded_at'] < PICKLIST_TTL and board['version'] == version:
+        return board
+
+    board = single_flight(f"picklist:{event_key}", lambda: load_picklist_board(event_key))
+    if board is not None:
+        picklist_boards[event_key] = board
+    return board
+
+def load_picklist_board(event_key):
+    year = int(event_key[:4])
+    started = time.monotonic()
+    teams_future = upstream_pool.submit(tba_get, f"/event/{event_key}/teams/keys")
+    index_future = upstream_pool.submit(get_event_match_index, event_key)
+
+    teams_response = section_result(teams_future, started, 'events', None)
+    if teams_response is None or teams_response.status_code != 200:
+        return None
+    team_keys = sorted(teams_response.json(), key=lambda key: int(key[3:]))
+    statbotics_futures = [upstream_pool.submit(fetch_statbotics_info, key[3:], year) for key in team_keys]
+    event_index = section_result(index_future, started, 'last_event', None)
+
+    def total(*values):
+        return sum(values) if all(isinstance(v, (int, float)) for v in values) else None
+
+    column = {name: i for i, name in enumerate(PICKLIST_COLUMNS)}
+    matrix = np.full((len(team_keys), len(PICKLIST_COLUMNS)), np.nan)
+    for row, (team_key, future) in enumerate(zip(team_keys, statbotics_futures)):
+        values = {}
+        epa = epa_data(section_result(future, started, 'statbotics', None))
+        if epa:
+            values.update(
+                epa=epa['total'], epa_auto=epa['auto'], epa_teleop=epa['teleop'],
+                epa_coral=total(epa['auto_coral_points'], epa['teleop_coral_points']),
+                epa_algae=total(epa['processor_algae_points'], epa['net_algae_points']),
+                epa_barge=epa['barge_points'],
+            )
+        stats = team_event_contributions(event_index, team_key) if event_index else None
+        if stats:
+            values.update({name: stats[name] for name in PICKLIST_COLUMNS if name in stats})
+        for name, value in values.items():
+            if isinstance(value, (int, float)):
+                matrix[row, column[name]] = value
+
+    # Standardize each column; teams missing a value count as average for it
+    present = ~np.isnan(matrix)
+    counts = np.maximum(present.sum(axis=0), 1)
+    mean = np.where(present, matrix, 0).sum(axis=0) / counts
+    std = np.sqrt((np.where(present, matrix - mean, 0) ** 2).sum(axis=0) / counts)
+    std[std == 0] = 1
+    zscores = np.where(present, (matrix - mean) / std, 0)
+
+    return {
+        'event_key': event_key,
+        'teams': [key[3:] for key in team_keys],
+        'matrix': matrix,
+        'zscores': zscores,
+        'column': column,
+        'version': (event_index['version'], event_index.get('webhook_seq', 0)) if event_index else None,
+        'loaded_at': time.monotonic(),
+    }
+
+def rank_picklist(board, metric, size):
+    weights = np.zeros(len(PICKLIST_COLUMNS))
+    for name, weight in PICKLIST_METRICS[metric][0].items():
+        weights[board['column'][name]] = weight
+    scores = board['zscores'] @ weights
+    return np.argsort(-scores, kind='stable')[:size], scores
+
+def format_picklist(board, metric, order, scores, favorites, note_counts, elapsed_ms):
+    shown = PICKLIST_METRICS[metric][1]
+    lines = [
+        f"📋 {board['event_key']} picklist by {metric} (top {len(order)} of {len(board['teams'])}; ⭐ favorite, 📝 notes)",
+        " #   Team  Score" + "".join(label.rjust(9) for label, _, _ in shown),
+    ]
+    for place, row in enumerate(order, 1):
+        team = board['teams'][row]
+        cells = []
+        for _, name, fmt in shown:
+            value = board['matrix'][row, board['column'][name]]
+            cells.append(("-" if np.isnan(value) else fmt.format(value)).rjust(9))
+        flags = (" ⭐" if team in favorites else "") + (f" 📝{note_counts[team]}" if note_counts.get(team) else "")
+        lines.append(f"{place:>2}. {team:>5} {scores[row]:>6.2f}" + "".join(cells) + flags)
+
+    age = time.monotonic() - board['loaded_at']
+    lines.append(f"\nRanked in {elapsed_ms:.2f} ms from data loaded {age:.0f}s ago. "
+                 f"Also try: by {', '.join(name for name in PICKLIST_METRICS if name != metric)}")
+    return "\n".join(lines)
+
+# --- Team History ---
+# "history 1507" lines up every season a team has played. All seasons are
+# fetched at once; finished ones are cached permanently, so repeat views only
+# go upstream for the current season.
+
+STATBOTICS_FIRST_SEASON = 2002
+
+def team_history(user_input):
+    team_number = extract_team_number(user_input)
+    if not team_number:
+        return jsonify({'reply': "⚠️ Please include a team number, e.g. 'history 1507'."})
+
+    years_response = tba_get(f"/team/frc{team_number}/years_participated")
+    if years_response.status_code != 200 or not years_response.json():
+        return jsonify({'reply': f"Sorry, I couldn't find team {team_number}. Please double check the number."})
+    years = sorted((year for year in years_response.json() if year <= CURRENT_SEASON), reverse=True)
+
+    started = time.monotonic()
+    futures = {
+        year: (
+            upstream_pool.submit(fetch_statbotics_info, team_number, year) if year >= STATBOTICS_FIRST_SEASON else None,
+            upstream_pool.submit(tba_get, f"/team/frc{team_number}/events/{year}/statuses"),
+            upstream_pool.submit(tba_get, f"/team/frc{team_number}/awards/{year}"),
+        )
+        for year in years
+    }
+
+    output = [f"📚 Team {team_number} History ({len(years)} seasons):"]
+    for year in years:
+        statbotics_future, statuses_future, awards_future = futures[year]
+        parts = []
+
+        epa = epa_data(section_result(statbotics_future, started, 'statbotics', None)) if statbotics_future else None
+        if epa and isinstance(epa['total'], (int, float)):
+            parts.append(f"EPA {epa['total']:.1f}" + (f" (#{epa['rank']})" if epa['rank'] else ""))
+
+        statuses_response = section_result(statuses_future, started, 'events', None)
+        events_info = statuses_response.json() if statuses_response is not None and statuses_response.status_code == 200 else {}
+        statuses = [info for info in (events_info or {}).values() if info]
+        ranks = [((info.get('qual') or {}).get('ranking') or {}).get('rank') for info in statuses]
+        ranks = [rank for rank in ranks if rank]
+        won = sum(1 for info in statuses if (info.get('playoff') or {}).get('status') == 'won')
+        if events_info:
+            parts.append(f"{len(events_info)} event{'s' if len(events_info) != 1 else ''}")
+        if ranks:
+            parts.append(f"best rank #{min(ranks)}")
+        if won:
+            parts.append(f"🏆 {won} win{'s' if won != 1 else ''}")
+
+        awards_response = section_result(awards_future, started, 'awards', None)
+        awards = len(awards_response.json()) if awards_response is not None and awards_response.status_code == 200 else 0
+        if awards:
+            parts.append(f"{awards} award{'s' if awards != 1 else ''}")
+
+        output.append(f"• {year}: " + (" · ".join(parts) if parts else "no data"))
+
+    output.append(f"\nType '{team_number} <year>' for a full season lookup.")
+    return jsonify({'reply': "\n".join(output)})
+
+# --- Event Prewarm ---
+# "load event <key>" pulls everything team_lookup needs for every team at an
+# event in one concurrent batch, so lookups during the event hit the cache.
+
+def extract_event_key(text):
+    match = re.search(r'\b(\d{4}[a-z][a-z0-9]*)\b', text.lower())
+    return match.group(1) if match else None
+
+def load_event(user_input):
+    event_key = extract_event_key(user_input)
+    if not event_key:
+        return jsonify({'reply': "⚠️ Please include an event key, e.g. 'load event 2025nyro'."})
+
+    with upstream_priority_as(PRIORITY_PREWARM):
+        summary = prewarm_event(event_key)
+    if summary is None:
+        return jsonify({'reply': f"Sorry, I couldn't find event {event_key}. Please double check the key."})
+
+    # The background refresher keeps this event warm from now on
+    set_current_event(event_key)
+
+    reply = (
+        f"📦 Loaded {event_key} in {summary['elapsed']:.1f}s\n"
+        f"• {summary['teams']} teams ({summary['requests']} team requests, {summary['failed']} failed)\n"
+        f"• {summary['matches']} matches indexed\n"
+        f"• {summary['statuses']} team statuses\n"
+        f"• {summary['awards']} awards"
+    )
+    return jsonify({'reply': reply})
+
+def prewarm_event(event_key):
+    started = time.monotonic()
+    year = int(event_key[:4])
+
+    teams_future = upstream_pool.submit(tba_get, f"/event/{event_key}/teams/keys")
+    statuses_future = upstream_pool.submit(tba_get, f"/event/{event_key}/teams/statuses")
+    awards_future = upstream_pool.submit(tba_get, f"/event/{event_key}/awards")
+    matches_future = upstream_pool.submit(get_event_match_index, event_key)
+
+    teams_response = teams_future.result()
+    if teams_response.status_code != 200:
+        return None
+    team_keys = teams_response.json()
+    print(f"📦 {event_key}: {len(team_keys)} teams, warming per-team data...")
+
+    # Everything team_lookup, generate_scout_opinion and generate_last_event_statistics read
+    team_futures = []
+    for team_key in team_keys:
+        team_futures += [
+            upstream_pool.submit(tba_get, f"/team/{team_key}"),
+            upstream_pool.submit(tba_get, f"/team/{team_key}/events/{year}"),
+            upstream_pool.submit(tba_get, f"/team/{team_key}/events/{year}/statuses"),
+            upstream_pool.submit(tba_get, f"/team/{team_key}/awards/{year}"),
+            upstream_pool.submit(fetch_statbotics_info, team_key[3:], year),
+        ]
+
+    failed = 0
+    for done, future in enumerate(as_completed(team_futures), 1):
+        try:
+            result = future.result()
+            if result is None or getattr(result, 'status_code', 200) != 200:
+                failed += 1
+        except Exception as e:
+            print(f"💥 Error warming {event_key}: {e}")
+            failed += 1
+        if done % 50 == 0 or done == len(team_futures):
+            print(f"📦 {event_key}: {done}/{len(team_futures)} team requests done ({time.monotonic() - started:.1f}s)")
+
+    event_index = matches_future.result()
+    statuses_response = statuses_future.result()
+    awards_response = awards_future.result()
+
+    return {
+        'teams': len(team_keys),
+        'requests': len(team_futures),
+        'failed': failed,
+        'matches': len(event_index['matches']) if event_index else 0,
+        'statuses': len(statuses_response.json() or {}) if statuses_response.status_code == 200 else 0,
+        'awards': len(awards_response.json()) if awards_response.status_code == 200 else 0,
+        'elapsed': time.monotonic() - started,
+    }
+
+# --- JSON API ---
+# The same data the chat replies are built from, as JSON for the strategy
+# tablet and spreadsheets. Responses carry a weak ETag over the body so
+# pollers get 304s until something changes, are gzipped when the client
+# accepts it, and ?fields=name,epa.total trims them to what the client reads.
+
+API_GZIP_MIN_BYTES = 512
+
+@app.route('/api/team/<int:team_number>')
+def api_team(team_number):
+    year = request.args.get('year', CURRENT_SEASON, type=int)
+    if not FIRST_SEASON <= year <= CURRENT_SEASON:
+        return api_error(f"year must be between {FIRST_SEASON} and {CURRENT_SEASON}.", 400)
+    with request_trace('api_team'):
+        data = team_data(str(team_number), year)
+    if data is None:
+        return api_error(f"Team {team_number} not found.", 404)
+    return api_response(data)
+
+@app.route('/api/team/<int:team_number>/notes')
+def api_team_notes(team_number):
+    with request_trace('api_team_notes'):
+        notes = load_team_notes(team_number)
+    return api_response({'team': team_number, 'notes': notes})
+
+@app.route('/api/event/<event_key>/teams')
+def api_event_teams(event_key):
+    with request_trace('api_event_teams'):
+        data = event_teams_data(event_key.lower())
+    if data is None:
+        return api_error(f"Event {event_key} not found.", 404)
+    return api_response(data)
+
+def api_response(data):
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+    if fields:
+        data = select_fields(data, fields)
+
+    body = json.dumps(data, sort_keys=True, separators=(',', ':')).encode()
+    response = Response(body, mimetype='application/json')
+    response.set_etag(hashlib.sha1(body).hexdigest(), weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    response.make_conditional(request)
+
+    if response.status_code == 200 and len(body) >= API_GZIP_MIN_BYTES and request.accept_encodings['gzip']:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+def api_error(message, status):
+    return jsonify({'error': message}), status
+
+def select_fields(data, fields):
+    """
+    Keeps only the requested keys; "epa.total" reaches into nested objects.
+    Lists are filtered item by item, so fields=teams.team,teams.opr works.
+    """
+    if isinstance(data, list):
+        return [select_fields(item, fields) for item in data]
+    if not isinstance(data, dict):
+        return data
+
+    nested = {}
+    for field in fields:
+        key, _, rest = field.partition('.')
+        if key in data:
+            nested.setdefault(key, []).append(rest)
+    return {
+        key: data[key] if '' in rests else select_fields(data[key], rests)
+        for key, rests in nested.items()
+    }
+
+def epa_data(statbotics_info):
+    epa = (statbotics_info or {}).get('epa', {})
+    breakdown = epa.get('breakdown', {})
+    if not epa:
+        return None
+    return {
+        'total': epa.get('total_points', {}).get('mean'),
+        'rank': epa.get('ranks', {}).get('total', {}).get('rank'),
+        'auto': breakdown.get('auto_points'),
+        'teleop': breakdown.get('teleop_points'),
+        'auto_coral_points': breakdown.get('auto_coral_points'),
+        'teleop_coral_points': breakdown.get('teleop_coral_points'),
+        'processor_algae_points': breakdown.get('processor_algae_points'),
+        'net_algae_points': breakdown.get('net_algae_points'),
+        'barge_points': breakdown.get('barge_points'),
+    }
+
+def team_data(team_number, year=CURRENT_SEASON):
+    """Structured version of a team lookup; None if TBA doesn't know the team."""
+    started = time.monotonic()
+    team_future = upstream_pool.submit(tba_get, f"/team/frc{team_number}")
+    events_future = upstream_pool.submit(tba_get, f"/team/frc{team_number}/events/{year}")
+    statuses_future = upstream_pool.submit(tba_get, f"/team/frc{team_number}/events/{year}/statuses")
+    awards_future = upstream_pool.submit(tba_get, f"/team/frc{team_number}/awards/{year}")
+    statbotics_future = upstream_pool.submit(fetch_statbotics_info, team_number, year)
+    last_event_future = submit_after(events_future, last_event_contributions, team_number, year=year)
+
+    team_response = section_result(team_future, started, 'team', None)
+    if team_response is not None and team_response.status_code != 200:
+        return None
+    team_info = team_response.json() if team_response is not None else {}
+
+    events_response = section_result(events_future, started, 'events', None)
+    events = events_response.json() if events_response is not None and events_response.status_code == 200 else []
+    statuses_response = section_result(statuses_future, started, 'events', None)
+    statuses = statuses_response.json() if statuses_response is not None and statuses_response.status_code == 200 else {}
+    awards_response = section_result(awards_future, started, 'awards', None)
+    statbotics_info = section_result(statbotics_future, started, 'statbotics', None)
+
+    season = []
+    for event in sorted(events, key=lambda e: e.get('start_date') or ''):
+        status = statuses.get(event['key']) or {}
+        season.append({
+            'event_key': event['key'],
+            'name': event.get('name'),
+            'rank': ((status.get('qual') or {}).get('ranking') or {}).get('rank'),
+            'playoff_status': (status.get('playoff') or {}).get('status'),
+        })
+
+    return {
+        'team': int(team_number),
+        'year': year,
+        'nickname': team_info.get('nickname'),
+        'city': team_info.get('city'),
+        'state_prov': team_info.get('state_prov'),
+        'country': team_info.get('country'),
+        'favorite': is_favorite(team_number),
+        'epa': epa_data(statbotics_info),
+        'statbotics_opinion': generate_statbotics_opinion(statbotics_info) or None,
+        'awards': len(awards_response.json()) if awards_response is not None and awards_response.status_code == 200 else None,
+        'last_event': section_result(last_event_future, started, 'last_event', None),
+        'season': season,
+        'season_matches': season_match_store(year).team_summary(f"frc{team_number}"),
+        'notes': load_team_notes(team_number),
+    }
+
+def event_teams_data(event_key):
+    """Every team at an event with its rank, event contributions and EPA."""
+    started = time.monotonic()
+    teams_future = upstream_pool.submit(tba_get, f"/event/{event_key}/teams/keys")
+    statuses_future = upstream_pool.submit(tba_get, f"/event/{event_key}/teams/statuses")
+    index_future = upstream_pool.submit(get_event_match_index, event_key)
+
+    teams_response = section_result(teams_future, started, 'events', None)
+    if teams_response is None or teams_response.status_code != 200:
+        return None
+    team_keys = teams_response.json()
+    statbotics_futures = {team_key: upstream_pool.submit(fetch_statbotics_info, team_key[3:]) for team_key in team_keys}
+
+    statuses_response = section_result(statuses_future, started, 'events', None)
+    statuses = statuses_response.json() if statuses_response is not None and statuses_response.status_code == 200 else {}
+    event_index = section_result(index_future, started, 'last_event', None)
+    note_counts = dict(get_scout_db().execute('SELECT team, COUNT(*) FROM notes GROUP BY team').fetchall())
+    favorites = set(load_favorites())
+
+    teams = []
+    for team_key in sorted(team_keys, key=lambda key: int(key[3:])):
+        team_number = team_key[3:]
+        status = (statuses or {}).get(team_key) or {}
+        teams.append({
+            'team': int(team_number),
+            'rank': ((status.get('qual') or {}).get('ranking') or {}).get('rank'),
+            'event_stats': team_event_contributions(event_index, team_key) if event_index else None,
+            'epa': epa_data(section_result(statbotics_futures[team_key], started, 'statbotics', None)),
+            'favorite': team_number in favorites,
+            'note_count': note_counts.get(team_number, 0),
+        })
+
+    return {
+        'event_key': event_key,
+        'matches_played': sum(1 for match in event_index['matches'] if match.get('score_breakdown')) if event_index else 0,
+        'teams': teams,
+    }
+
+# --- Offline Snapshots ---
+# "export event <key>" writes everything team_lookup needs for an event, plus
+# our notes and favorites, into one compressed zip. The zip's central directory
+# is the index, so opening a snapshot only reads that; each response is
+# inflated the first time it is asked for. "offline <key or path>" then serves
+# every upstream read from the snapshot with no network at all.
+
+class EventSnapshot:
+    def __init__(self, path):
+        self.path = path
+        self.archive = zipfile.ZipFile(path)
+        self.names = set(self.archive.namelist())
+        self.manifest = json.loads(self.archive.read('manifest.json'))
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def read(self, name):
+        with self._lock:
+            if name not in self._loaded:
+                self._loaded[name] = self.archive.read(name) if name in self.names else None
+            return self._loaded[name]
+
+    def get(self, url):
+        body = self.read(snapshot_member(url))
+        if body is None:
+            return CachedResponse(url, 404, b'null')
+        return CachedResponse(url, 200, body, expires_at=float('inf'))
+
+    def close(self):
+        self.archive.close()
+
+offline_snapshot = None
+_snapshot_checked_at = 0.0
+_snapshot_lock = threading.Lock()
+
+def snapshot_member(url):
+    service, path = upstream_service(url)
+    return f"{service}{path}"
+
+def snapshot_path(name):
+    # An event key or snapshot file name, resolved inside SNAPSHOT_DIR; None for anything outside it
+    directory = os.path.realpath(SNAPSHOT_DIR)
+    file_name = name if name.endswith('.scoutsnap') else f"{name}.scoutsnap"
+    path = os.path.realpath(os.path.join(directory, file_name))
+    return path if os.path.dirname(path) == directory else None
+
+def active_snapshot():
+    """
+    The snapshot this worker should read from, or None when online. Checked
+    against the shared app_state at most once a second so every gunicorn
+    worker follows the offline/online commands.
+    """
+    global offline_snapshot, _snapshot_checked_at
+    now = time.monotonic()
+    if now - _snapshot_checked_at < 1:
+        return offline_snapshot
+
+    with _snapshot_lock:
+        _snapshot_checked_at = now
+        row = get_cache_db().execute("SELECT value FROM app_state WHERE key = 'offline_snapshot'").fetchone()
+        path = row[0] if row else OFFLINE_SNAPSHOT
+        current = offline_snapshot.path if offline_snapshot else None
+        if (path or None) != current:
+            # Not closed: other threads may still be reading the old one; it closes once they let go
+            offline_snapshot = EventSnapshot(path) if path else None
+        return offline_snapshot
+
+def set_offline_snapshot(path):
+    global _snapshot_checked_at
+    get_cache_db().execute(
+        "INSERT INTO app_state (key, value) VALUES ('offline_snapshot', ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (path,)
+    )
+    _snapshot_checked_at = 0.0
+
+def export_event(user_input):
+    event_key = extract_event_key(user_input)
+    if not event_key:
+        return jsonify({'reply': "⚠️ Please include an event key, e.g. 'export event 2025nyro'."})
+    if active_snapshot() is not None:
+        return jsonify({'reply': "⚠️ Can't export while offline. Type 'online' first."})
+
+    started = time.monotonic()
+    with upstream_priority_as(PRIORITY_PREWARM):
+        summary = prewarm_event(event_key)
+    if summary is None:
+        return jsonify({'reply': f"Sorry, I couldn't find event {event_key}. Please double check the key."})
+
+    team_keys = tba_get(f"/event/{event_key}/teams/keys").json()
+    urls = [
+        f"{TBA_API_BASE}/event/{event_key}/teams/keys",
+        f"{TBA_API_BASE}/event/{event_key}/teams/statuses",
+        f"{TBA_API_BASE}/event/{event_key}/awards",
+        f"{TBA_API_BASE}/event/{event_key}/matches",
+    ]
+    for team_key in team_keys:
+        urls += team_refresh_urls(team_key[3:], int(event_key[:4]))
+
+    db = get_scout_db()
+    notes = [
+        {'team': team, 'text': text, 'timestamp': timestamp}
+        for team, text, timestamp in db.execute('SELECT team, text, timestamp FROM notes ORDER BY id')
+    ]
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = os.path.join(SNAPSHOT_DIR, f"{event_key}.scoutsnap")
+    temp_path = f"{path}.tmp"
+    stored = 0
+    with zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for url in urls:
+            row = read_cache_row(url)
+            if row and row[0] == 200:
+                archive.writestr(snapshot_member(url), row[1])
+                stored += 1
+        archive.writestr('scout/notes.json', json.dumps(notes))
+        archive.writestr('scout/favorites.json', json.dumps(load_favorites()))
+        archive.writestr('manifest.json', json.dumps({
+            'event_key': event_key,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'teams': len(team_keys),
+        }))
+    os.replace(temp_path, path)
+
+    reply = (
+        f"💾 Exported {event_key} to {path} in {time.monotonic() - started:.1f}s\n"
+        f"• {len(team_keys)} teams, {stored} responses, {len(notes)} notes\n"
+        f"• {os.path.getsize(path) / 1024:.0f} KB compressed\n"
+        f"Type 'offline {event_key}' to use it without internet."
+    )
+    return jsonify({'reply': reply})
+
+def go_offline(user_input):
+    # export_event writes lowercase event keys
+    name = re.sub(r'^\s*offline\s*', '', user_input, flags=re.IGNORECASE).strip().lower()
+    if not name:
+        return jsonify({'reply': "⚠️ Please say which snapshot, e.g. 'offline 2025nyro'."})
+
+    path = snapshot_path(name)
+    if path is None:
+        return jsonify({'reply': f"⚠️ Snapshots load by event key from {SNAPSHOT_DIR}, e.g. 'offline 2025nyro'."})
+    try:
+        started = time.monotonic()
+        snapshot = EventSnapshot(path)
+        imported = import_snapshot_scout_data(snapshot)
+        snapshot.close()
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return jsonify({'reply': f"⚠️ I couldn't open a snapshot at {path}."})
+
+    set_offline_snapshot(path)
+    return jsonify({'reply': (
+        f"📴 Offline mode: reading {snapshot.manifest['event_key']} "
+        f"(saved {snapshot.manifest['created']}) from {path} "
+        f"in {(time.monotonic() - started) * 1000:.0f} ms. "
+        f"Imported {imported} notes. Type 'online' to reconnect."
+    )})
+
+def go_online():
+    set_offline_snapshot('')
+    return jsonify({'reply': "📶 Back online — using live TBA and Statbotics data."})
+
+def import_snapshot_scout_data(snapshot):
+    """Merges the snapshot's notes and favorites into the local store, skipping ones we already have."""
+    db = get_scout_db()
+    imported = 0
+    for note in json.loads(snapshot.read('scout/notes.json') or b'[]'):
+        exists = db.execute(
+            'SELECT 1 FROM notes WHERE team = ? AND text = ? AND timestamp = ?',
+            (note['team'], note['text'], note['timestamp'])
+        ).fetchone()
+        if not exists:
+            db.execute(
+                'INSERT INTO notes (team, text, timestamp) VALUES (?, ?, ?)',
+                (note['team'], note['text'], note['timestamp'])
+            )
+            imported += 1
+    for team_number in json.loads(snapshot.read('scout/favorites.json') or b'[]'):
+        add_favorite(team_number)
+    return imported
+
+# --- Tracing and Metrics ---
+# Each /ask request collects spans (upstream calls, reply sections) in a
+# contextvar that follows it onto the upstream pool. Totals feed the
+# Prometheus-style /metrics endpoint; slow requests are logged with their
+# span breakdown. Metrics are per worker process, labeled with its pid.
+
+SLOW_REQUEST_SECONDS = float(os.getenv('SLOW_REQUEST_SECONDS', '3'))
+TRACE_TOP_SPANS = 10  # distinct spans shown in a slow-request log line
+TRACE_MAX_CHARS = 1000
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRIC_HELP = {
+    'scout_requests_total': ('counter', 'Commands handled, by command.'),
+    'scout_request_seconds': ('histogram', 'Time to answer a command, by command.'),
+    'scout_section_seconds': ('histogram', 'Time from lookup start until a team reply section was ready.'),
+    'scout_upstream_requests_total': ('counter', 'Upstream HTTP calls, by service, endpoint and status.'),
+    'scout_upstream_request_seconds': ('histogram', 'Upstream HTTP call latency, including retries.'),
+    'scout_upstream_errors_total': ('counter', 'Upstream calls that failed to connect or returned 5xx.'),
+    'scout_upstream_429_total': ('counter', 'Upstream 429 responses.'),
+    'scout_upstream_queue_wait_seconds': ('histogram', 'Time upstream calls waited for a rate-limit token, by priority.'),
+}
+
+current_trace = contextvars.ContextVar('current_trace', default=None)
+_counters = {}
+_histograms = {}
+_metrics_lock = threading.Lock()
+
+def metric_key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def inc_counter(name, amount=1, **labels):
+    key = metric_key(name, labels)
+    with _metrics_lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def observe(name, seconds, **labels):
+    key = metric_key(name, labels)
+    with _metrics_lock:
+        buckets = _histograms.setdefault(key, [0] * (len(LATENCY_BUCKETS) + 2))
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                buckets[i] += 1
+        buckets[-2] += 1  # count
+        buckets[-1] += seconds  # sum
+
+def record_span(name, seconds, **tags):
+    if name == 'section':
+        observe('scout_section_seconds', seconds, **tags)
+    trace = current_trace.get()
+    if trace is not None:
+        trace.append((name, tags, seconds))
+
+@contextmanager
+def request_trace(command):
+    trace = []
+    token = current_trace.set(trace)
+    priority_token = upstream_priority.set(PRIORITY_INTERACTIVE)
+    started = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        upstream_priority.reset(priority_token)
+        current_trace.reset(token)
+        elapsed = time.perf_counter() - started
+        inc_counter('scout_requests_total', command=command)
+        observe('scout_request_seconds', elapsed, command=command)
+        if elapsed >= SLOW_REQUEST_SECONDS:
+            print(f"🐢 Slow {command} request took {elapsed:.2f}s: {format_trace(trace)}")
+
+def format_trace(trace):
+    # Identical spans (a prewarm's 200 team fetches) collapse into count x total; slowest first
+    if not trace:
+        return "no spans recorded"
+    totals = {}
+    for name, tags, seconds in trace:
+        key = (name, tuple(tags.items()))
+        count, total = totals.get(key, (0, 0.0))
+        totals[key] = (count + 1, total + seconds)
+
+    parts = []
+    ranked = sorted(totals.items(), key=lambda item: -item[1][1])
+    for (name, tags), (count, total) in ranked[:TRACE_TOP_SPANS]:
+        detail = " ".join(f"{key}={value}" for key, value in tags)
+        parts.append(f"{name}[{detail}] {f'{count}x ' if count > 1 else ''}{total * 1000:.0f}ms")
+    if len(ranked) > TRACE_TOP_SPANS:
+        parts.append(f"+{len(ranked) - TRACE_TOP_SPANS} more")
+    line = ", ".join(parts)
+    return line if len(line) <= TRACE_MAX_CHARS else line[:TRACE_MAX_CHARS - 3] + "..."
+
+def record_upstream_call(service, endpoint, status, seconds):
+    status = str(status)
+    record_span('upstream', seconds, endpoint=endpoint, status=status)
+    inc_counter('scout_upstream_requests_total', service=service, endpoint=endpoint, status=status)
+    observe('scout_upstream_request_seconds', seconds, service=service, endpoint=endpoint)
+    if status == 'error' or status.startswith('5'):
+        inc_counter('scout_upstream_errors_total', service=service, endpoint=endpoint)
+    if status == '429':
+        inc_counter('scout_upstream_429_total', service=service)
+
+def format_labels(labels, **extra):
+    labels = dict(labels, worker=os.getpid(), **extra)
+    return "{" + ",".join(f'{key}="{str(value).replace(chr(34), chr(39))}"' for key, value in labels.items()) + "}"
+
+def render_metrics():
+    with _metrics_lock:
+        counters = dict(_counters)
+        histograms = {key: list(buckets) for key, buckets in _histograms.items()}
+
+    lines = []
+    for name, (kind, help_text) in METRIC_HELP.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{name}{format_labels(labels)} {value}")
+        for (metric, labels), buckets in sorted(histograms.items()):
+            if metric != name:
+                continue
+            for bound, count in zip(LATENCY_BUCKETS, buckets):
+                lines.append(f"{name}_bucket{format_labels(labels, le=bound)} {count}")
+            lines.append(f"{name}_bucket{format_labels(labels, le='+Inf')} {buckets[-2]}")
+            lines.append(f"{name}_count{format_labels(labels)} {buckets[-2]}")
+            lines.append(f"{name}_sum{format_labels(labels)} {buckets[-1]:.6f}")
+
+    # The cache counters live in the shared database, so they cover every worker
+    # (other workers' counts lag by up to CACHE_STATS_FLUSH_SECONDS).
+    lines += ["# HELP scout_cache_requests_total Upstream cache lookups by endpoint and outcome (all workers).",
+              "# TYPE scout_cache_requests_total counter"]
+    served = total = 0
+    flush_cache_events()
+    rows = get_cache_db().execute('SELECT endpoint, hits, revalidated, misses FROM cache_stats').fetchall()
+    for endpoint, hits, revalidated, misses in rows:
+        for outcome, value in (('hit', hits), ('revalidated', revalidated), ('miss', misses)):
+            lines.append(f'scout_cache_requests_total{{endpoint="{endpoint}",outcome="{outcome}"}} {value}')
+        served += hits + revalidated
+        total += hits + revalidated + misses
+    lines += ["# HELP scout_cache_hit_ratio Share of upstream lookups answered from cache (all workers).",
+              "# TYPE scout_cache_hit_ratio gauge",
+              f"scout_cache_hit_ratio {served / total if total else 0:.4f}"]
+
+    lines += ["# HELP scout_upstream_pool_connections Connections opened per upstream host.",
+              "# TYPE scout_upstream_pool_connections counter",
+              "# HELP scout_upstream_pool_requests Requests sent per upstream host.",
+              "# TYPE scout_upstream_pool_requests counter"]
+    for pool in connection_pool_stats():
+        labels = format_labels({'host': pool['host']})
+        lines.append(f"scout_upstream_pool_connections{labels} {pool['connections']}")
+        lines.append(f"scout_upstream_pool_requests{labels} {pool['requests']}")
+
+    lines += ["# HELP scout_upstream_queue_depth Upstream calls waiting for a rate-limit token.",
+              "# TYPE scout_upstream_queue_depth gauge",
+              "# HELP scout_upstream_rate_limit Current requests/second allowed per service (after 429 backoff).",
+              "# TYPE scout_upstream_rate_limit gauge"]
+    for service, limiter in rate_limiters.items():
+        state = limiter.state()
+        for priority, depth in state['waiting'].items():
+            lines.append(f"scout_upstream_queue_depth{format_labels({'service': service, 'priority': priority})} {depth}")
+        lines.append(f"scout_upstream_rate_limit{format_labels({'service': service})} {state['rate']:.3f}")
+
+    lines += ["# HELP scout_refresh_queue_depth URLs waiting for a background refresh.",
+              "# TYPE scout_refresh_queue_depth gauge",
+              f"scout_refresh_queue_depth{format_labels({})} {_refresh_queue.qsize()}"]
+    return "\n".join(lines) + "\n"
+
+# --- Upstream Rate Limiter ---
+# Every upstream call takes a token from its service's bucket first. Waiting
+# calls are served strictly by priority: interactive requests (/ask, /api),
+# then event prewarms, then background refreshes, and the lower priorities
+# must leave part of the bucket untouched so a scout never queues behind them.
+# A 429 halves the service's rate and pauses it for Retry-After; successes
+# win the rate back gradually. Budgets are split across WEB_CONCURRENCY
+# worker processes.
+
+WORKER_PROCESSES = max(int(os.getenv('WEB_CONCURRENCY', '1')), 1)
+RATE_LIMIT_RETRIES = 3
+RETRY_BACKOFF_MAX = 8  # seconds; unthrottled 429 retries back off like urllib3's 5xx retries
+RATE_LIMIT_RESERVE = 0.25  # share of the bucket only interactive calls may spend
+RATE_LIMIT_PAUSE = 5  # seconds to pause after a 429 without Retry-After
+
+# Set by single_flight: the priority of the most urgent caller waiting on this fetch
+flight_priority = contextvars.ContextVar('flight_priority', default=None)
+
+class RateLimiter:
+    def __init__(self, service, rate, burst):
+        self.service = service
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.waiting = []
+        self.order = itertools.count()
+        self.cond = threading.Condition()
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        # A shared fetch's priority can rise while it waits (see single_flight)
+        urgency = flight_priority.get() or [upstream_priority.get()]
+        priority = urgency[0]
+        ticket = [urgency, next(self.order)]
+        started = time.monotonic()
+        with self.cond:
+            heapq.heappush(self.waiting, ticket)
+            while True:
+                now = time.monotonic()
+                self.refill(now)
+                # Lower priorities must leave the reserve for interactive calls
+                needed = 1 + (RATE_LIMIT_RESERVE * self.burst if urgency[0] != PRIORITY_INTERACTIVE else 0)
+                if self.waiting[0] is ticket and now >= self.paused_until and self.tokens >= needed:
+                    heapq.heappop(self.waiting)
+                    self.tokens -= 1
+                    self.cond.notify_all()
+                    break
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                else:
+                    delay = max(needed - self.tokens, 0.01) / self.rate
+                self.cond.wait(timeout=min(delay, 1.0))
+
+        waited = time.monotonic() - started
+        observe('scout_upstream_queue_wait_seconds', waited, service=self.service, priority=PRIORITY_NAMES[priority])
+        if waited >= 0.001:
+            record_span('queue', waited, service=self.service, priority=PRIORITY_NAMES[priority])
+
+    def reorder(self):
+        with self.cond:
+            heapq.heapify(self.waiting)
+            self.cond.notify_all()
+
+    def throttled(self, retry_after=None):
+        try:
+            pause = float(retry_after)
+        except (TypeError, ValueError):
+            pause = RATE_LIMIT_PAUSE
+        with self.cond:
+            self.rate = max(self.rate / 2, self.base_rate / 16)
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+            self.tokens = min(self.tokens, 0)
+        print(f"🚦 {self.service} returned 429; slowing to {self.rate:.1f} req/s for now")
+
+    def succeeded(self):
+        if self.rate < self.base_rate:
+            with self.cond:
+                self.rate = min(self.base_rate, self.rate + self.base_rate / 20)
+
+    def state(self):
+        with self.cond:
+            self.refill(time.monotonic())
+            waiting = {name: 0 for name in PRIORITY_NAMES.values()}
+            for (priority,), _ in self.waiting:
+                waiting[PRIORITY_NAMES[priority]] += 1
+            return {'rate': self.rate, 'base_rate': self.base_rate, 'tokens': self.tokens, 'waiting': waiting,
+                    'paused_for': max(self.paused_until - time.monotonic(), 0)}
+
+def retry_delay(attempt, retry_after=None):
+    # With no limiter to pause, a 429 waits out Retry-After or a jittered exponential backoff
+    try:
+        return min(float(retry_after), RETRY_BACKOFF_MAX)
+    except (TypeError, ValueError):
+        return min(0.5 * 2 ** attempt + random.uniform(0, 0.25), RETRY_BACKOFF_MAX)
+
+def rate_limiter(service, default_rate):
+    # Requests per second for the whole deployment; "0" turns the limit off
+    rate = float(os.getenv(f'{service.upper()}_RATE_LIMIT', default_rate)) / WORKER_PROCESSES
+    if rate <= 0:
+        return None
+    return RateLimiter(service, rate, burst=max(rate * 2, 2))
+
+rate_limiters = {
+    service: limiter
+    for service, limiter in (('tba', rate_limiter('tba', '30')), ('statbotics', rate_limiter('statbotics', '15')))
+    if limiter
+}
+
+# --- Upstream Response Cache ---
+# Every TBA call goes through a URL-keyed cache stored in SQLite so all gunicorn
+# workers share it and it survives restarts. Fresh entries (per Cache-Control)
+# are served straight from disk; stale ones are revalidated with
+# If-None-Match / If-Modified-Since so an unchanged resource costs a 304.
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS http_cache (
+    url TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    expires_at REAL NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fetch_leases (
+    url TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recent_views (
+    team TEXT PRIMARY KEY,
+    viewed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS recent_views_viewed_at ON recent_views (viewed_at);
+CREATE TABLE IF NOT EXISTS webhook_matches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_key TEXT NOT NULL,
+    match_key TEXT NOT NULL,
+    body TEXT NOT NULL,
+    received_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS webhook_matches_event ON webhook_matches (event_key, id);
+CREATE TABLE IF NOT EXISTS app_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    endpoint TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    revalidated INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_cache_local = connection_local()
+
+class CachedResponse:
+    """Just enough of requests.Response for the helpers that read TBA data."""
+
+    def __init__(self, url, status_code, content, etag=None, last_modified=None, expires_at=0):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error for {self.url}")
+
+def build_http_session():
+    """
+    One keep-alive session shared by every TBA and Statbotics helper. Pools are
+    sized to the upstream thread pool so concurrent lookups reuse connections
+    instead of paying a TLS handshake each, and 5xx responses are retried
+    with jittered exponential backoff. 429s are retried in fetch_upstream,
+    through the rate limiter when one is configured.
+    """
+    retry = Retry(
+        total=3,
+        connect=2,
+        read=2,
+        status=3,
+        backoff_factor=0.5,
+        backoff_jitter=0.25,
+        backoff_max=8,
+        status_forcelist=(500, 502, 503, 504),  # 429s are retried in fetch_upstream
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=False,  # or urllib3 would sleep out 429s itself
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=UPSTREAM_WORKERS, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+http = build_http_session()
+
+def connection_pool_stats():
+    """Per-host connection counts; requests far above connections means keep-alive is working."""
+    stats = []
+    for adapter in set(http.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats.append({
+                'host': pool.host,
+                'connections': pool.num_connections,
+                'requests': pool.num_requests,
+            })
+    return stats
+
+def connect_sqlite(path, schema):
+    # Autocommit connection in WAL mode so readers and the writer run side by side.
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(schema)
+    return conn
+
+def get_cache_db():
+    # One connection per thread
+    conn = getattr(_cache_local, 'conn', None)
+    if conn is None:
+        conn = connect_sqlite(CACHE_DB, CACHE_SCHEMA)
+        _cache_local.conn = conn
+    return conn
+
+def upstream_service(url):
+    if url.startswith(STATBOTICS_API_BASE):
+        return 'statbotics', url[len(STATBOTICS_API_BASE):]
+    if url.startswith(TBA_API_BASE):
+        return 'tba', url[len(TBA_API_BASE):]
+    return 'other', url
+
+def endpoint_template(url):
+    """
+    Collapses a URL into its endpoint shape, e.g. .../team/frc1507/awards/2025
+    becomes "tba /team/frc{team}/awards/{year}", for per-endpoint cache stats.
+    """
+    service, path = upstream_service(url)
+    path = re.sub(r'/frc\d+', '/frc{team}', path)
+    path = re.sub(r'/(team\w*)/\d+', r'/\1/{team}', path)
+    path = re.sub(r'/\d{4}[a-z][a-z0-9]*', '/{event}', path)
+    path = re.sub(r'/\d{4}(?=/|$)', '/{year}', path)
+    path = re.sub(r'/\d+(?=/|$)', '/{n}', path)
+    return f"{service} {path}"
+
+def cache_max_age(response_headers):
+    cache_control = response_headers.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0
+    match = re.search(r's-maxage=(\d+)', cache_control) or re.search(r'max-age=(\d+)', cache_control)
+    if not match:
+        return 0
+    try:
+        age = int(response_headers.get('Age', 0))
+    except ValueError:
+        age = 0
+    return max(int(match.group(1)) - age, 0)
+
+# Season-scoped paths: /team/frcN/events/2024, /awards/2024, /team_year/N/2024, /event/2024nyro/...
+SEASON_IN_PATH = re.compile(r'/(?:events|awards|team_year/\d+)/(\d{4})(?:/|$)|^/events?/(\d{4})')
+
+def url_season(url):
+    match = SEASON_IN_PATH.search(upstream_service(url)[1])
+    return int(match.group(1) or match.group(2)) if match else None
+
+def cache_lifetime(url, response_headers):
+    # Finished seasons never change, so they are cached for good and never revalidated
+    season = url_season(url)
+    if season is not None and season < CURRENT_SEASON:
+        return float('inf')
+    return cache_max_age(response_headers)
+
+# Hit/miss counts are tallied in memory and flushed to the shared cache_stats
+# table every CACHE_STATS_FLUSH_SECONDS (and before they are read), so a cache
+# hit never waits on SQLite's writer lock.
+CACHE_STATS_FLUSH_SECONDS = 10
+CACHE_OUTCOMES = ('hits', 'revalidated', 'misses')
+_cache_event_counts = {}
+_cache_event_lock = threading.Lock()
+_cache_events_flushed_at = time.monotonic()
+
+def record_cache_event(endpoint, outcome):
+    with _cache_event_lock:
+        counts = _cache_event_counts.setdefault(endpoint, dict.fromkeys(CACHE_OUTCOMES, 0))
+        counts[outcome] += 1
+        due = time.monotonic() - _cache_events_flushed_at >= CACHE_STATS_FLUSH_SECONDS
+    if due:
+        flush_cache_events()
+
+def flush_cache_events():
+    global _cache_event_counts, _cache_events_flushed_at
+    with _cache_event_lock:
+        pending, _cache_event_counts = _cache_event_counts, {}
+        _cache_events_flushed_at = time.monotonic()
+    if not pending:
+        return
+
+    conn = get_cache_db()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.executemany(
+            'INSERT INTO cache_stats (endpoint, hits, revalidated, misses) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(endpoint) DO UPDATE SET hits = hits + excluded.hits, '
+            'revalidated = revalidated + excluded.revalidated, misses = misses + excluded.misses',
+            [(endpoint, *(counts[outcome] for outcome in CACHE_OUTCOMES)) for endpoint, counts in pending.items()]
+        )
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+def read_cache_row(url):
+    return get_cache_db().execute(
+        'SELECT status, body, etag, last_modified, expires_at, fetched_at FROM http_cache WHERE url = ?', (url,)
+    ).fetchone()
+
+def cached_get(url, headers=None):
+    snapshot = active_snapshot()
+    if snapshot is not None:
+        # Offline mode: the snapshot is the only source
+        return snapshot.get(url)
+
+    endpoint = endpoint_template(url)
+    row = read_cache_row(url)
+
+    now = time.time()
+    if row and row[4] > now:
+        record_cache_event(endpoint, 'hits')
+        return CachedResponse(url, row[0], row[1], row[2], row[3], expires_at=row[4])
+
+    if row and row[4] > now - STALE_SERVE_SECONDS:
+        # Stale-while-revalidate: answer now, refresh in the background
+        record_cache_event(endpoint, 'hits')
+        queue_refresh(url, refresh_priority(url))
+        return CachedResponse(url, row[0], row[1], row[2], row[3], expires_at=row[4])
+
+    # Only one upstream trip per URL at a time; concurrent callers share it
+    return single_flight(url, lambda: fetch_with_lease(url, headers, endpoint))
+
+def fetch_with_lease(url, headers, endpoint, refresh=False):
+    # Another thread may have refreshed it while we were getting here. Background
+    # refreshes also renew entries that would go stale before the next cycle.
+    row = read_cache_row(url)
+    if row and row[4] > time.time() + (REFRESH_INTERVAL if refresh else 0):
+        record_cache_event(endpoint, 'hits')
+        return CachedResponse(url, row[0], row[1], row[2], row[3], expires_at=row[4])
+
+    owner = acquire_fetch_lease(url)
+    if owner is None:
+        # Another worker is already fetching this URL; wait for it to land in the cache
+        shared = wait_for_peer_fetch(url, row[5] if row else 0)
+        if shared is not None:
+            record_cache_event(endpoint, 'hits')
+            return shared
+
+    try:
+        return fetch_upstream(url, headers, endpoint, row)
+    finally:
+        if owner is not None:
+            get_cache_db().execute('DELETE FROM fetch_leases WHERE url = ? AND owner = ?', (url, owner))
+
+def fetch_upstream(url, headers, endpoint, row):
+    db = get_cache_db()
+    now = time.time()
+
+    request_headers = dict(headers or {})
+    if row and row[2]:
+        request_headers['If-None-Match'] = row[2]
+    if row and row[3]:
+        request_headers['If-Modified-Since'] = row[3]
+
+    service = upstream_service(url)[0]
+    limiter = rate_limiters.get(service)
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        if limiter:
+            limiter.acquire()
+        started = time.perf_counter()
+        try:
+            response = http.get(url, headers=request_headers, timeout=HTTP_TIMEOUT)
+        except requests.RequestException:
+            record_upstream_call(service, endpoint, 'error', time.perf_counter() - started)
+            if row:
+                # Upstream is unreachable; a stale copy beats no answer at all.
+                print(f"⚠️ Serving stale cache for {url}")
+                return CachedResponse(url, row[0], row[1], row[2], row[3])
+            raise
+
+        record_upstream_call(service, endpoint, response.status_code, time.perf_counter() - started)
+        if response.status_code != 429 or attempt == RATE_LIMIT_RETRIES:
+            break
+        if limiter:
+            limiter.throttled(response.headers.get('Retry-After'))
+            if row:
+                # Throttled: the cached copy is good enough until the budget recovers
+                return CachedResponse(url, row[0], row[1], row[2], row[3], expires_at=row[4])
+        else:
+            time.sleep(retry_delay(attempt, response.headers.get('Retry-After')))
+    if limiter and response.status_code != 429:
+        limiter.succeeded()
+    expires_at = now + cache_lifetime(url, response.headers)
+
+    if response.status_code == 304 and row:
+        etag = response.headers.get('ETag', row[2])
+        last_modified = response.headers.get('Last-Modified', row[3])
+        db.execute(
+            'UPDATE http_cache SET etag = ?, last_modified = ?, expires_at = ?, fetched_at = ? WHERE url = ?',
+            (etag, last_modified, expires_at, now, url)
+        )
+        record_cache_event(endpoint, 'revalidated')
+        return CachedResponse(url, row[0], row[1], etag, last_modified, expires_at=expires_at)
+
+    record_cache_event(endpoint, 'misses')
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if response.status_code == 200 and 'no-store' not in response.headers.get('Cache-Control', '').lower():
+        db.execute(
+            'INSERT OR REPLACE INTO http_cache (url, status, body, etag, last_modified, expires_at, fetched_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (url, response.status_code, response.content, etag, last_modified, expires_at, now)
+        )
+        bump_season_matches_version(url)
+    return CachedResponse(url, response.status_code, response.content, etag, last_modified, expires_at=expires_at)
+
+# --- Request Coalescing ---
+# Five scouts typing the same team number should cost one upstream round trip.
+# Within a worker, concurrent callers for the same key wait on one Future;
+# across gunicorn workers, a short lease row in the shared cache database
+# lets one worker fetch while the others wait for its result to be cached.
+
+FETCH_LEASE_SECONDS = 15
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def single_flight(key, fetch):
+    priority = upstream_priority.get()
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            # Nested flights (an event index fetching its matches) share the outer urgency
+            future.urgency = flight_priority.get() or [priority]
+            _inflight[key] = future
+        promoted = not leader and priority < future.urgency[0]
+        if promoted:
+            future.urgency[0] = priority
+
+    if not leader:
+        if promoted:
+            # A scout is now waiting on this fetch; move it up the limiter queue
+            for limiter in rate_limiters.values():
+                limiter.reorder()
+        return future.result()
+
+    token = flight_priority.set(future.urgency)
+    try:
+        result = fetch()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        flight_priority.reset(token)
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+def acquire_fetch_lease(url, seconds=FETCH_LEASE_SECONDS):
+    owner = f"{os.getpid()}-{threading.get_ident()}"
+    now = time.time()
+    acquired = get_cache_db().execute(
+        'INSERT INTO fetch_leases (url, owner, expires_at) VALUES (?, ?, ?) '
+        'ON CONFLICT(url) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at '
+        'WHERE fetch_leases.expires_at < ?',
+        (url, owner, now + seconds, now)
+    ).rowcount
+    return owner if acquired else None
+
+def wait_for_peer_fetch(url, last_fetched_at):
+    db = get_cache_db()
+    deadline = time.monotonic() + FETCH_LEASE_SECONDS
+    lease_held = True
+    while lease_held and time.monotonic() < deadline:
+        time.sleep(0.05)
+        lease_held = db.execute(
+            'SELECT 1 FROM fetch_leases WHERE url = ? AND expires_at >= ?', (url, time.time())
+        ).fetchone() is not None
+        row = db.execute(
+            'SELECT status, body, etag, last_modified, expires_at FROM http_cache WHERE url = ? AND fetched_at > ?',
+            (url, last_fetched_at)
+        ).fetchone()
+        if row:
+            return CachedResponse(url, row[0], row[1], row[2], row[3], expires_at=row[4])
+    # The other worker gave up or got an uncacheable response
+    return None
+
+# --- Background Refresher ---
+# Keeps the data scouts ask for most already fresh: favorites first, then
+# recently viewed teams, then the rest of the current event. Stale entries are
+# served immediately (up to STALE_SERVE_SECONDS past expiry) and queued here.
+# One worker at a time runs the periodic cycle, chosen with a lease row.
+
+REFRESH_INTERVAL = int(os.getenv('REFRESH_INTERVAL', '120'))  # seconds; 0 turns off periodic refreshes
+STALE_SERVE_SECONDS = int(os.getenv('STALE_SERVE_SECONDS', '3600'))
+RECENT_VIEW_SECONDS = 30 * 60
+REFRESH_WORKERS = 2
+
+REFRESH_FAVORITE = 0
+REFRESH_RECENT = 1
+REFRESH_EVENT = 2
+
+_refresh_queue = queue.PriorityQueue()
+_refresh_queued = set()
+_refresh_lock = threading.Lock()
+_refresh_order = itertools.count()
+_refresher_started = False
+
+def start_background_refresher():
+    global _refresher_started
+    if _refresher_started:
+        return
+    with _refresh_lock:
+        if _refresher_started:
+            return
+        _refresher_started = True
+    for i in range(REFRESH_WORKERS):
+        threading.Thread(target=refresh_worker, name=f'cache-refresh-{i}', daemon=True).start()
+    if REFRESH_INTERVAL > 0:
+        threading.Thread(target=refresh_scheduler, name='cache-refresh-scheduler', daemon=True).start()
+
+def queue_refresh(url, priority):
+    if active_snapshot() is not None:
+        return  # Nothing to refresh from while offline
+    with _refresh_lock:
+        if url in _refresh_queued:
+            return
+        _refresh_queued.add(url)
+    _refresh_queue.put((priority, next(_refresh_order), url))
+    start_background_refresher()
+
+def refresh_priority(url):
+    match = re.search(r'/frc(\d+)|/team_year/(\d+)', url)
+    team_number = match and (match.group(1) or match.group(2))
+    return REFRESH_FAVORITE if team_number and is_favorite(team_number) else REFRESH_RECENT
+
+def refresh_worker():
+    while True:
+        _, _, url = _refresh_queue.get()
+        with _refresh_lock:
+            _refresh_queued.discard(url)
+        try:
+            refresh_url(url)
+        except Exception as e:
+            print(f"💥 Background refresh failed for {url}: {e}")
+
+def refresh_url(url):
+    headers = {"X-TBA-Auth-Key": TBA_AUTH_KEY} if url.startswith(TBA_API_BASE) else None
+    single_flight(url, lambda: fetch_with_lease(url, headers, endpoint_template(url), refresh=True))
+
+    # Re-index refreshed event matches now rather than on the next lookup
+    match = re.search(r'/event/([^/]+)/matches$', url)
+    entry = event_match_store.get(match.group(1)) if match else None
+    if entry:
+        entry['expires_at'] = 0
+        get_event_match_index(match.group(1))
+
+def refresh_scheduler():
+    while True:
+        try:
+            if acquire_fetch_lease('refresher:cycle', seconds=REFRESH_INTERVAL):
+                schedule_refresh_cycle()
+        except Exception as e:
+            print(f"💥 Error scheduling background refresh: {e}")
+        time.sleep(REFRESH_INTERVAL)
+
+def schedule_refresh_cycle():
+    favorites = load_favorites()
+    recent = [team for (team,) in get_cache_db().execute(
+        'SELECT team FROM recent_views WHERE viewed_at > ? ORDER BY viewed_at DESC',
+        (time.time() - RECENT_VIEW_SECONDS,)
+    )]
+
+    event_teams = []
+    event_key = current_event()
+    if event_key:
+        if not TBA_WEBHOOK_SECRET:
+            # Without webhooks, polling is the only way to see new matches
+            queue_refresh(f"{TBA_API_BASE}/event/{event_key}/matches", REFRESH_RECENT)
+        teams_response = tba_get(f"/event/{event_key}/teams/keys")
+        if teams_response.status_code == 200:
+            event_teams = [team_key[3:] for team_key in teams_response.json()]
+
+    seen = set()
+    for priority, teams in ((REFRESH_FAVORITE, favorites), (REFRESH_RECENT, recent), (REFRESH_EVENT, event_teams)):
+        for team_number in teams:
+            if team_number in seen:
+                continue
+            seen.add(team_number)
+            for url in team_refresh_urls(team_number):
+                queue_refresh(url, priority)
+
+def team_refresh_urls(team_number, year=CURRENT_SEASON):
+    # Everything team_lookup reads for a team
+    return [
+        f"{TBA_API_BASE}/team/frc{team_number}",
+        f"{TBA_API_BASE}/team/frc{team_number}/events/{year}",
+        f"{TBA_API_BASE}/team/frc{team_number}/events/{year}/statuses",
+        f"{TBA_API_BASE}/team/frc{team_number}/awards/{year}",
+        f"{STATBOTICS_API_BASE}/team_year/{team_number}/{year}",
+    ]
+
+def record_team_view(team_number):
+    get_cache_db().execute(
+        'INSERT INTO recent_views (team, viewed_at) VALUES (?, ?) '
+        'ON CONFLICT(team) DO UPDATE SET viewed_at = excluded.viewed_at',
+        (str(team_number), time.time())
+    )
+
+def current_event():
+    row = get_cache_db().execute("SELECT value FROM app_state WHERE key = 'current_event'").fetchone()
+    return row[0] if row else CURRENT_EVENT
+
+def set_current_event(event_key):
+    get_cache_db().execute(
+        "INSERT INTO app_state (key, value) VALUES ('current_event', ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (event_key,)
+    )
+
+def tba_get(path):
+    return cached_get(f"{TBA_API_BASE}{path}", headers={"X-TBA-Auth-Key": TBA_AUTH_KEY})
+
+def statbotics_get(path):
+    return cached_get(f"{STATBOTICS_API_BASE}{path}")
+
+def cache_stats():
+    flush_cache_events()
+    rows = get_cache_db().execute(
+        'SELECT endpoint, hits, revalidated, misses FROM cache_stats ORDER BY hits + revalidated + misses DESC'
+    ).fetchall()
+    if not rows:
+        return jsonify({'reply': "No upstream requests have been made yet."})
+
+    output = ["🗄️ Upstream cache stats (hits / revalidated / misses):"]
+    for endpoint, hits, revalidated, misses in rows:
+        total = hits + revalidated + misses
+        ratio = (hits + revalidated) / total * 100 if total else 0
+        output.append(f"{endpoint}: {hits} / {revalidated} / {misses} ({ratio:.0f}% served from cache)")
+
+    pool_stats = connection_pool_stats()
+    if pool_stats:
+        output.append("\n🔌 Connection reuse (this worker):")
+        for pool in pool_stats:
+            reused = pool['requests'] - pool['connections']
+            output.append(f"{pool['host']}: {pool['requests']} requests over {pool['connections']} connections ({max(reused, 0)} reused)")
+
+    if rate_limiters:
+        output.append("\n🚦 Upstream budget (this worker):")
+        for service, limiter in rate_limiters.items():
+            state = limiter.state()
+            waiting = ', '.join(f"{count} {name}" for name, count in state['waiting'].items() if count) or 'none'
+            line = f"{service}: {state['rate']:.1f}/{state['base_rate']:.1f} req/s, {state['tokens']:.0f} tokens, waiting: {waiting}"
+            if state['paused_for']:
+                line += f" (paused {state['paused_for']:.0f}s after a 429)"
+            output.append(line)
+    return jsonify({'reply': "\n".join(output)})
+
+# --- Scout Data Store ---
+# Notes and favorites live in SQLite (WAL) so each change is one atomic row
+# write, no matter how many scouts are writing or how big the season gets.
+
+SCOUT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    team TEXT NOT NULL,
+    text TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_team ON notes (team, id);
+CREATE INDEX IF NOT EXISTS notes_timestamp ON notes (timestamp);
+CREATE TABLE IF NOT EXISTS favorites (
+    team TEXT PRIMARY KEY,
+    added_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    applied_at TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    text, content='notes', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE OF text ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO notes_fts (rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+SEARCH_RESULTS_LIMIT = 10
+
+_scout_local = connection_local()
+
+def get_scout_db():
+    conn = getattr(_scout_local, 'conn', None)
+    if conn is None:
+        conn = connect_sqlite(SCOUT_DB, SCOUT_SCHEMA)
+        run_migrations(conn)
+        _scout_local.conn = conn
+    return conn
+
+def import_json_store(conn):
+    """Imports the old team_notes.json / favorites.json files."""
+    if os.path.exists(NOTES_FILE):
+        with open(NOTES_FILE, 'r') as f:
+            notes = json.load(f)
+        for team_key, team_notes in notes.items():
+            conn.executemany(
+                'INSERT INTO notes (team, text, timestamp) VALUES (?, ?, ?)',
+                [(team_key, note['text'], note['timestamp']) for note in team_notes]
+            )
+
+    if os.path.exists(FAVORITES_FILE):
+        with open(FAVORITES_FILE, 'r') as f:
+            favorites = json.load(f)
+        today = datetime.now().strftime("%Y-%m-%d")
+        conn.executemany(
+            'INSERT OR IGNORE INTO favorites (team, added_at) VALUES (?, ?)',
+            [(str(team_key), today) for team_key in favorites]
+        )
+
+def rebuild_notes_index(conn):
+    """Indexes notes written before the search index existed; triggers keep it current after."""
+    conn.execute("INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')")
+
+SCOUT_MIGRATIONS = [
+    ('json_store', import_json_store),
+    ('notes_fts', rebuild_notes_index),
+]
+
+def run_migrations(conn):
+    """Applies each one-time migration exactly once, even with several workers starting together."""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        applied = {name for (name,) in conn.execute('SELECT name FROM migrations')}
+        for name, migrate in SCOUT_MIGRATIONS:
+            if name in applied:
+                continue
+            migrate(conn)
+            conn.execute(
+                'INSERT INTO migrations (name, applied_at) VALUES (?, ?)',
+                (name, datetime.now().isoformat(timespec='seconds'))
+            )
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
 # --- Favorites Management ---
 
 def load_favorites():
-    if not os.path.exists(FAVORITES_FILE):
-        with open(FAVORITES_FILE, 'w') as f:
-            json.dump([], f)
-    with open(FAVORITES_FILE, 'r') as f:
-        return json.load(f)
+    rows = get_scout_db().execute('SELECT team FROM favorites ORDER BY rowid').fetchall()
+    return [team for (team,) in rows]
 
-def save_favorites(favorites):
-    with open(FAVORITES_FILE, 'w') as f:
-        json.dump(favorites, f, indent=2)
+def is_favorite(team_number):
+    return get_scout_db().execute('SELECT 1 FROM favorites WHERE team = ?', (str(team_number),)).fetchone() is not None
 
 def add_favorite(team_number):
-    favorites = load_favorites()
-    team_key = str(team_number)
-    if team_key not in favorites:
-        favorites.append(team_key)
-    save_favorites(favorites)
+    get_scout_db().execute(
+        'INSERT OR IGNORE INTO favorites (team, added_at) VALUES (?, ?)',
+        (str(team_number), datetime.now().strftime("%Y-%m-%d"))
+    )
 
 def remove_favorite(team_number):
-    favorites = load_favorites()
-    team_key = str(team_number)
-    if team_key in favorites:
-        favorites.remove(team_key)
-    save_favorites(favorites)
+    get_scout_db().execute('DELETE FROM favorites WHERE team = ?', (str(team_number),))
 
 def favorite_team(user_input):
-    team_number = extract_team_number(user_input)
+    team_number, suggestions = resolve_team(user_input)
     if team_number:
         add_favorite(team_number)
         return jsonify({'reply': f"⭐ Team {team_number} has been added to your favorites!"})
     else:
-        return jsonify({'reply': "⚠️ I couldn't find a valid team number to favorite."})
+        return jsonify({'reply': team_suggestions_reply(suggestions, "⚠️ I couldn't find a valid team number to favorite.")})
 
 def unfavorite_team(user_input):
-    team_number = extract_team_number(user_input)
+    team_number, suggestions = resolve_team(user_input)
     if team_number:
         remove_favorite(team_number)
         return jsonify({'reply': f"🚫 Team {team_number} has been removed from your favorites."})
     else:
-        return jsonify({'reply': "I couldn't find which team to unfavorite."})
+        return jsonify({'reply': team_suggestions_reply(suggestions, "I couldn't find which team to unfavorite.")})
 
 def list_favorites():
     favorites = load_favorites()
@@ -471,25 +3181,18 @@ def list_favorites():
 
 # --- Notes Management ---
 
-def load_team_notes():
-    if not os.path.exists(NOTES_FILE):
-        with open(NOTES_FILE, 'w') as f:
-            json.dump({}, f)
-    with open(NOTES_FILE, 'r') as f:
-        return json.load(f)
-
-def save_team_notes(notes):
-    with open(NOTES_FILE, 'w') as f:
-        json.dump(notes, f, indent=2)
+def load_team_notes(team_number):
+    rows = get_scout_db().execute(
+        'SELECT id, text, timestamp FROM notes WHERE team = ? ORDER BY id', (str(team_number),)
+    ).fetchall()
+    return [{"id": note_id, "text": text, "timestamp": timestamp} for note_id, text, timestamp in rows]
 
 def add_note_to_team(team_number, note_text):
-    notes = load_team_notes()
-    team_key = str(team_number)
     timestamp = datetime.now().strftime("%Y-%m-%d")
-    if team_key not in notes:
-        notes[team_key] = []
-    notes[team_key].append({"text": note_text, "timestamp": timestamp})
-    save_team_notes(notes)
+    get_scout_db().execute(
+        'INSERT INTO notes (team, text, timestamp) VALUES (?, ?, ?)',
+        (str(team_number), note_text, timestamp)
+    )
 
 def add_note(user_input):
     try:
@@ -508,6 +3211,9 @@ def add_note(user_input):
         team_number = extract_team_number(team_part)
         if not team_number:
             team_number = extract_team_number(note_text)
+        # "note: poofs: great climber", "note: cheesy poofs great climber" or "note: 8 fast"
+        if not team_number:
+            team_number, note_text = split_team_prefix(note_text)
 
         if not team_number:
             return jsonify({'reply': "⚠️ I still couldn't figure out which team you're noting. Please try again."})
@@ -521,23 +3227,54 @@ def add_note(user_input):
 
 
 def generate_notes_display(team_number):
-    notes = load_team_notes()
-    team_key = str(team_number)
-    if team_key not in notes or not notes[team_key]:
+    team_notes = load_team_notes(team_number)
+    if not team_notes:
         return "No custom notes yet."
 
     output = []
-    for idx, note in enumerate(notes[team_key], 1):
+    for idx, note in enumerate(team_notes, 1):
         output.append(f"{idx}. {note['text']} (added {note['timestamp']})")
     return "\n".join(output)
 
 def list_notes():
-    notes = load_team_notes()
-    if not notes:
+    counts = get_scout_db().execute('SELECT team, COUNT(*) FROM notes GROUP BY team ORDER BY team').fetchall()
+    if not counts:
         return jsonify({'reply': "There are no saved notes yet."})
     output = []
-    for team_key in sorted(notes.keys()):
-        output.append(f"Team {team_key} has {len(notes[team_key])} notes.")
+    for team_key, count in counts:
+        output.append(f"Team {team_key} has {count} notes.")
+    return jsonify({'reply': "\n".join(output)})
+
+def search_notes(user_input):
+    """
+    Keyword search over every note. Each word must appear (prefix match, so
+    "def" finds "defense"); results are ranked by relevance, nudged toward
+    recent notes, and capped at SEARCH_RESULTS_LIMIT.
+    """
+    query_text = re.sub(r'^\s*search\s*(notes?)?\s*:?', '', user_input, flags=re.IGNORECASE)
+    terms = re.findall(r'\w+', query_text.lower())
+    if not terms:
+        return jsonify({'reply': "⚠️ Please type 'search notes' followed by a keyword, e.g. 'search notes defense'."})
+
+    match_query = " ".join(f'"{term}"*' for term in terms)
+    rows = get_scout_db().execute(
+        """
+        SELECT notes.team, notes.text, notes.timestamp,
+               -bm25(notes_fts) / (1 + (julianday('now') - julianday(notes.timestamp)) / 30.0) AS score
+        FROM notes_fts JOIN notes ON notes.id = notes_fts.rowid
+        WHERE notes_fts MATCH ?
+        ORDER BY score DESC, notes.id DESC
+        LIMIT ?
+        """,
+        (match_query, SEARCH_RESULTS_LIMIT)
+    ).fetchall()
+
+    if not rows:
+        return jsonify({'reply': f"🕵️ No notes found matching \"{' '.join(terms)}\"."})
+
+    output = [f"🕵️ Notes matching \"{' '.join(terms)}\":"]
+    for team_key, text, timestamp, _ in rows:
+        output.append(f"- Team {team_key}: {text} (added {timestamp})")
     return jsonify({'reply': "\n".join(output)})
 
 def delete_note(user_input):
@@ -548,15 +3285,16 @@ def delete_note(user_input):
         note_index = int(parts[0]) - 1
         team_number = extract_team_number(" ".join(parts[2:]))
 
-        notes = load_team_notes()
-        team_key = str(team_number)
+        deleted_note = None
+        if note_index >= 0:
+            deleted_note = get_scout_db().execute(
+                'DELETE FROM notes WHERE id = '
+                '(SELECT id FROM notes WHERE team = ? ORDER BY id LIMIT 1 OFFSET ?) RETURNING text',
+                (str(team_number), note_index)
+            ).fetchone()
 
-        if team_key in notes and 0 <= note_index < len(notes[team_key]):
-            deleted_note = notes[team_key].pop(note_index)
-            if not notes[team_key]:
-                del notes[team_key]
-            save_team_notes(notes)
-            return jsonify({'reply': f"🗑️ Deleted note: \"{deleted_note['text']}\" for Team {team_number}."})
+        if deleted_note:
+            return jsonify({'reply': f"🗑️ Deleted note: \"{deleted_note[0]}\" for Team {team_number}."})
         else:
             return jsonify({'reply': "Couldn't find that note to delete."})
     except Exception:
@@ -573,13 +3311,15 @@ def edit_note(user_input):
 
         new_text = parts[1].strip()
 
-        notes = load_team_notes()
-        team_key = str(team_number)
+        updated = 0
+        if note_index >= 0:
+            updated = get_scout_db().execute(
+                'UPDATE notes SET text = ?, timestamp = ? WHERE id = '
+                '(SELECT id FROM notes WHERE team = ? ORDER BY id LIMIT 1 OFFSET ?)',
+                (new_text, datetime.now().strftime("%Y-%m-%d"), str(team_number), note_index)
+            ).rowcount
 
-        if team_key in notes and 0 <= note_index < len(notes[team_key]):
-            notes[team_key][note_index]["text"] = new_text
-            notes[team_key][note_index]["timestamp"] = datetime.now().strftime("%Y-%m-%d")
-            save_team_notes(notes)
+        if updated:
             return jsonify({'reply': f"✏️ Edited note for Team {team_number}."})
         else:
             return jsonify({'reply': "Couldn't find that note to edit."})
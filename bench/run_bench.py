@@ -0,0 +1,275 @@
+"""
+Latency / throughput benchmark for /ask.
+
+Starts the stub upstream (bench/stub_upstream.py), then for each gunicorn
+worker x thread combination boots the bot against it with a fresh cache,
+warms up, and drives /ask from concurrent clients with a weighted mix of team
+lookups, note writes, compares and note searches. Reports p50/p95/p99 latency
+and requests per second, overall and per command, and saves everything as
+JSON (bench/results/<timestamp>.json by default) for comparing runs.
+
+Usage:
+    python bench/run_bench.py
+    python bench/run_bench.py --workers 1,2,4 --threads 1,8 --duration 30 --latency-ms 120 --rate-429 0.02
+    python bench/run_bench.py --baseline bench/results/20251001-1830.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stub_upstream import StubState, load_fixtures, start_stub, synthesize_fixtures  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = 'lookup=70,note=10,compare=10,search=10'
+NOTE_WORDS = ['fast', 'defense', 'climber', 'coral', 'algae', 'barge', 'consistent', 'tipped', 'auto', 'driver']
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {'lookup', 'note', 'compare', 'search'}
+    if unknown:
+        raise SystemExit(f"Unknown mix entries: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def make_command(kind, teams, rng):
+    if kind == 'lookup':
+        return str(rng.choice(teams))
+    if kind == 'note':
+        return f"note: {rng.choice(teams)} {' '.join(rng.sample(NOTE_WORDS, 3))}"
+    if kind == 'compare':
+        return 'compare ' + ' '.join(str(team) for team in rng.sample(teams, 3))
+    return f"search notes {rng.choice(NOTE_WORDS)}"
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(latencies, elapsed):
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else 0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        'max_ms': round(max(latencies) * 1000, 1) if latencies else None,
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_bot(workers, threads, stub_url, data_dir, worker_class):
+    port = free_port()
+    env = dict(
+        os.environ,
+        TBA_API_BASE=f'{stub_url}/tba',
+        STATBOTICS_API_BASE=f'{stub_url}/statbotics',
+        TBA_AUTH_KEY='bench',
+        TBA_CACHE_DB=os.path.join(data_dir, 'tba_cache.sqlite3'),
+        SCOUT_DB=os.path.join(data_dir, 'scout_data.sqlite3'),
+        SNAPSHOT_DIR=os.path.join(data_dir, 'snapshots'),
+        REFRESH_INTERVAL='0',
+        # Measure the bot, not the upstream budget, unless a limit is exported
+        TBA_RATE_LIMIT=os.getenv('TBA_RATE_LIMIT', '0'),
+        STATBOTICS_RATE_LIMIT=os.getenv('STATBOTICS_RATE_LIMIT', '0'),
+        # Passed the way a deployment would, so gunicorn.conf.py's derived settings apply
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_THREADS=str(threads),
+        GUNICORN_WORKER_CLASS=worker_class or ('gthread' if threads > 1 else 'sync'),
+    )
+    env.pop('OFFLINE_SNAPSHOT', None)
+    command = [
+        sys.executable, '-m', 'gunicorn', 'app:app',
+        '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+    ]
+    process = subprocess.Popen(command, cwd=REPO_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"gunicorn exited early:\n{process.stderr.read()}")
+        try:
+            requests.get(base_url + '/', timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit("gunicorn did not start within 30s")
+
+
+def stop_bot(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def drive(base_url, teams, mix, concurrency, duration, seed):
+    """Runs closed-loop clients for `duration` seconds; returns per-request (kind, seconds, ok)."""
+    results = []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+    kinds, weights = zip(*mix.items())
+
+    def client(index):
+        rng = random.Random(seed + index)
+        session = requests.Session()
+        while time.monotonic() < stop_at:
+            kind = rng.choices(kinds, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = session.post(f'{base_url}/ask', json={'team_number': make_command(kind, teams, rng)},
+                                        timeout=60)
+                ok = response.status_code == 200 and 'something unexpected' not in response.text
+            except requests.RequestException:
+                ok = False
+            with lock:
+                results.append((kind, time.perf_counter() - started, ok))
+
+    clients = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return results
+
+
+def run_config(args, stub_url, teams, mix, workers, threads):
+    data_dir = tempfile.mkdtemp(prefix='scoutbench-')
+    process, base_url = start_bot(workers, threads, stub_url, data_dir, args.worker_class)
+    try:
+        if args.warmup:
+            drive(base_url, teams, mix, args.concurrency, args.warmup, args.seed + 1000)
+        requests.post(f'{stub_url}/_stats/reset', timeout=5)
+        started = time.perf_counter()
+        results = drive(base_url, teams, mix, args.concurrency, args.duration, args.seed)
+        elapsed = time.perf_counter() - started
+        upstream = requests.get(f'{stub_url}/_stats', timeout=5).json()
+    finally:
+        stop_bot(process)
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    ok = [seconds for _, seconds, success in results if success]
+    summary = {
+        'workers': workers,
+        'threads': threads,
+        **summarize(ok, elapsed),
+        'errors': sum(1 for _, _, success in results if not success),
+        'by_command': {
+            kind: summarize([seconds for k, seconds, success in results if k == kind and success], elapsed)
+            for kind in mix
+        },
+        'upstream': upstream,
+    }
+    return summary
+
+
+def print_summary(summary, baseline=None):
+    line = (f"w={summary['workers']:<2} t={summary['threads']:<2}  {summary['rps']:>7.1f} rps  "
+            f"p50 {summary['p50_ms']}ms  p95 {summary['p95_ms']}ms  p99 {summary['p99_ms']}ms  "
+            f"errors {summary['errors']}  upstream {summary['upstream']['requests']} "
+            f"({summary['upstream']['throttled']} throttled)")
+    if baseline:
+        line += (f"  | vs baseline: rps {summary['rps'] - baseline['rps']:+.1f}, "
+                 f"p95 {summary['p95_ms'] - baseline['p95_ms']:+.1f}ms")
+    print(line)
+    for kind, stats in summary['by_command'].items():
+        if stats['requests']:
+            print(f"    {kind:<8} {stats['requests']:>6} req  p50 {stats['p50_ms']}ms  "
+                  f"p95 {stats['p95_ms']}ms  p99 {stats['p99_ms']}ms")
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4', help='comma-separated gunicorn worker counts')
+    parser.add_argument('--threads', default='1,4', help='comma-separated threads per worker')
+    parser.add_argument('--worker-class', help='gunicorn worker class (default: sync, or gthread when threads > 1; '
+                                               'gevent needs `pip install gevent`)')
+    parser.add_argument('--concurrency', type=int, default=16, help='simultaneous clients')
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds per configuration')
+    parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds before each run (0 = cold)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'command weights (default {DEFAULT_MIX})')
+    parser.add_argument('--fixtures', help='.scoutsnap snapshot to replay (default: synthetic event)')
+    parser.add_argument('--latency-ms', type=float, default=80, help='stub upstream latency')
+    parser.add_argument('--jitter-ms', type=float, default=30)
+    parser.add_argument('--rate-429', type=float, default=0.0, help='fraction of upstream requests throttled')
+    parser.add_argument('--max-age', type=int, default=60, help='Cache-Control max-age sent by the stub')
+    parser.add_argument('--seed', type=int, default=1507)
+    parser.add_argument('--output', help='results file (default bench/results/<timestamp>.json)')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else synthesize_fixtures()
+    teams = sorted({int(name.split('frc')[1]) for name in fixtures
+                    if name.startswith('tba/team/frc') and name.count('/') == 2})
+    state = StubState(fixtures, args.latency_ms, args.jitter_ms, args.rate_429, max_age=args.max_age, seed=args.seed)
+    stub = start_stub(state)
+    stub_url = f'http://127.0.0.1:{stub.server_port}'
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {(run['workers'], run['threads']): run for run in json.load(f)['runs']}
+
+    print(f"Benchmarking /ask: {len(teams)} teams, mix {args.mix}, {args.concurrency} clients, "
+          f"{args.duration:.0f}s per config, upstream {args.latency_ms:.0f}±{args.jitter_ms:.0f}ms, "
+          f"{args.rate_429:.0%} 429s")
+    runs = []
+    for workers in [int(n) for n in args.workers.split(',')]:
+        for threads in [int(n) for n in args.threads.split(',')]:
+            summary = run_config(args, stub_url, teams, mix, workers, threads)
+            print_summary(summary, baseline.get((workers, threads)))
+            runs.append(summary)
+    stub.shutdown()
+
+    output = args.output or os.path.join(REPO_DIR, 'bench', 'results', f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+            'runs': runs,
+        }, f, indent=2)
+    print(f"Saved results to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Memory and scan-speed comparison of SeasonMatchStore against the raw TBA
+match dicts it replaces.
+
+Builds a synthetic season (same generator as the stub upstream), then reports
+bytes per match for both forms and times three scans: every team's season
+averages, one team's matches, and one event's matches.
+
+Usage:
+    python bench/season_store_bench.py --events 170 --teams-per-event 40
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+from stub_upstream import synthesize_matches  # noqa: E402
+from app import SEASON_FIELDS, SeasonMatchStore  # noqa: E402
+
+FIELD = 'teleopCoralCount'
+
+
+def synthesize_season(event_count, teams_per_event, seed):
+    """{event_key: raw /matches JSON bytes}, with teams drawn from a season-sized pool."""
+    rng = random.Random(seed)
+    pool = rng.sample(range(1, 10000), 3500)
+    skill = {team: rng.uniform(0.3, 1.0) for team in pool}
+    return {
+        f'2025e{index:03d}': json.dumps(synthesize_matches(f'2025e{index:03d}', rng.sample(pool, teams_per_event),
+                                                           skill, rng)).encode()
+        for index in range(event_count)
+    }
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, retained
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def dict_team_averages(payloads):
+    totals = {}
+    for matches in payloads.values():
+        for match in matches:
+            for color in ('red', 'blue'):
+                breakdown = (match.get('score_breakdown') or {}).get(color)
+                if not breakdown:
+                    continue
+                for team_key in match['alliances'][color]['team_keys']:
+                    entry = totals.setdefault(team_key, [0.0, 0])
+                    entry[0] += breakdown.get(FIELD, 0)
+                    entry[1] += 1
+    return {team_key: total / count for team_key, (total, count) in totals.items()}
+
+
+def store_team_averages(store):
+    return dict(zip(store.team_keys, store.team_means(FIELD).tolist()))
+
+
+def dict_team_matches(payloads, team_key):
+    return [
+        match for matches in payloads.values() for match in matches
+        if team_key in match['alliances']['red']['team_keys'] + match['alliances']['blue']['team_keys']
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=170)
+    parser.add_argument('--teams-per-event', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1507)
+    parser.add_argument('--output', help='optional JSON results file')
+    args = parser.parse_args()
+
+    raw = synthesize_season(args.events, args.teams_per_event, args.seed)
+    payloads, dict_bytes = measure(lambda: {key: json.loads(body) for key, body in raw.items()})
+    store, store_bytes = measure(lambda: SeasonMatchStore(payloads))
+    matches = sum(len(m) for m in payloads.values())
+
+    team_key = store.team_keys[0]
+    event_key = store.event_keys[len(store.event_keys) // 2]
+    dict_all, dict_all_s = timed(lambda: dict_team_averages(payloads), args.repeat)
+    store_all, store_all_s = timed(lambda: store_team_averages(store), args.repeat)
+    assert all(abs(dict_all[key] - store_all[key]) < 1e-3 for key in dict_all)
+    _, dict_team_s = timed(lambda: dict_team_matches(payloads, team_key), args.repeat)
+    _, store_team_s = timed(lambda: store.values[store.team_rows(team_key)[0]], args.repeat)
+    _, dict_event_s = timed(lambda: [m for m in payloads[event_key] if m.get('score_breakdown')], args.repeat)
+    _, store_event_s = timed(lambda: store.values[store.event_rows(event_key)], args.repeat)
+
+    results = {
+        'events': args.events,
+        'matches': matches,
+        'alliance_rows': len(store),
+        'fields': len(SEASON_FIELDS),
+        'dict_bytes_per_match': round(dict_bytes / matches),
+        'store_bytes_per_match': round(store_bytes / matches),
+        'store_array_bytes_per_match': round(store.nbytes / matches),
+        'all_team_averages_ms': {'dict': dict_all_s * 1000, 'store': store_all_s * 1000},
+        'one_team_ms': {'dict': dict_team_s * 1000, 'store': store_team_s * 1000},
+        'one_event_ms': {'dict': dict_event_s * 1000, 'store': store_event_s * 1000},
+    }
+
+    print(f"{matches} matches across {args.events} events ({len(store.team_keys)} teams)")
+    print(f"Memory per match: dicts {results['dict_bytes_per_match']} B, "
+          f"store {results['store_bytes_per_match']} B ({results['store_array_bytes_per_match']} B in arrays), "
+          f"{dict_bytes / store_bytes:.0f}x smaller")
+    for label, key in (('Every team\'s season average', 'all_team_averages_ms'),
+                       ('One team\'s matches', 'one_team_ms'), ('One event\'s matches', 'one_event_ms')):
+        timing = results[key]
+        print(f"{label}: dicts {timing['dict']:.3f} ms, store {timing['store']:.3f} ms "
+              f"({timing['dict'] / max(timing['store'], 1e-9):.0f}x faster)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+Local stand-in for TBA and Statbotics, for benchmarking the scout bot
+without touching the real APIs.
+
+TBA is served under /tba and Statbotics under /statbotics, so point the bot at
+    TBA_API_BASE=http://127.0.0.1:8800/tba
+    STATBOTICS_API_BASE=http://127.0.0.1:8800/statbotics
+
+Responses come from a fixture set: either a recorded offline snapshot
+(`export event 2025nyro` writes one from real data) or, by default, seeded
+synthetic events (one per season) that are identical from run to run. Latency, 429s and
+Cache-Control are configurable so the bot's cache, retry and fan-out paths all
+get exercised. GET /_stats returns what the stub has served.
+
+Usage:
+    python bench/stub_upstream.py --port 8800 --latency-ms 80 --rate-429 0.02
+    python bench/stub_upstream.py --fixtures snapshots/2025nyro.scoutsnap
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SEASON = 2025
+ENDGAMES = ['DeepCage', 'ShallowCage', 'Parked', 'None']
+
+
+def load_fixtures(path):
+    """Reads a .scoutsnap offline snapshot into {"tba/path": body bytes}."""
+    with zipfile.ZipFile(path) as archive:
+        return {
+            name: archive.read(name)
+            for name in archive.namelist()
+            if name.startswith(('tba/', 'statbotics/'))
+        }
+
+
+def synthesize_fixtures(seasons=(SEASON - 2, SEASON - 1, SEASON), team_count=40, seed=1507):
+    """Made-up events (one per season) with played quals, seeded so every run sees the same data."""
+    rng = random.Random(seed)
+    teams = sorted(rng.sample(range(1, 10000), team_count - 1) + [1507])
+    fixtures = {}
+
+    def put(member, body):
+        fixtures[member] = json.dumps(body).encode()
+
+    for team in teams:
+        put(f'tba/team/frc{team}', {
+            'key': f'frc{team}', 'team_number': team, 'nickname': f'Team {team}',
+            'city': 'Rochester', 'state_prov': 'New York', 'country': 'USA',
+        })
+        put(f'tba/team/frc{team}/years_participated', list(seasons))
+    put('tba/teams/0/simple', [
+        {'key': f'frc{team}', 'team_number': team, 'nickname': f'Team {team}',
+         'city': 'Rochester', 'state_prov': 'New York', 'country': 'USA'}
+        for team in teams
+    ])
+
+    for season in seasons:
+        event_key = f'{season}bench'
+        skill = {team: rng.uniform(0.3, 1.0) for team in teams}
+        event = {'key': event_key, 'name': 'Benchmark Regional', 'end_date': f'{season}-03-30'}
+        statuses = {}
+        for rank, team in enumerate(sorted(teams, key=lambda t: -skill[t]), 1):
+            statuses[f'frc{team}'] = {
+                'qual': {'ranking': {'rank': rank}},
+                'playoff': {'status': 'won' if rank == 1 else 'eliminated'},
+            }
+
+        for team in teams:
+            level = skill[team]
+            put(f'tba/team/frc{team}/events/{season}', [event])
+            put(f'tba/team/frc{team}/events/{season}/statuses', {event_key: statuses[f'frc{team}']})
+            put(f'tba/team/frc{team}/awards/{season}', [
+                {'name': 'Award', 'event_key': event_key} for _ in range(int(level * 4) - 1)
+            ])
+            put(f'statbotics/team_year/{team}/{season}', {
+                'team': team, 'year': season,
+                'epa': {
+                    'total_points': {'mean': round(level * 90, 1)},
+                    'ranks': {'total': {'rank': int((1 - level) * 3000) + 1}},
+                    'breakdown': {'auto_points': round(level * 20, 1), 'teleop_points': round(level * 55, 1)},
+                },
+            })
+
+        put(f'tba/event/{event_key}/matches', synthesize_matches(event_key, teams, skill, rng))
+        put(f'tba/event/{event_key}/teams/keys', [f'frc{team}' for team in teams])
+        put(f'tba/event/{event_key}/teams/statuses', statuses)
+        put(f'tba/event/{event_key}/awards', [])
+    return fixtures
+
+
+def synthesize_matches(event_key, teams, skill, rng):
+    matches = []
+    for number in range(1, len(teams) * 2 + 1):
+        lineup = rng.sample(teams, 6)
+        match = {
+            'key': f'{event_key}_qm{number}', 'comp_level': 'qm', 'match_number': number,
+            'time': 1700000000 + number * 420, 'alliances': {}, 'score_breakdown': {},
+        }
+        for color, alliance in (('red', lineup[:3]), ('blue', lineup[3:])):
+            match['alliances'][color] = {'team_keys': [f'frc{team}' for team in alliance]}
+            breakdown = {'autoCoralCount': 0, 'teleopCoralCount': 0, 'wallAlgaeCount': 0, 'netAlgaeCount': 0,
+                         'endGameBargePoints': 0}
+            for position, team in enumerate(alliance, 1):
+                level = skill[team]
+                breakdown['autoCoralCount'] += rng.randint(0, round(level * 4))
+                breakdown['teleopCoralCount'] += rng.randint(0, round(level * 10))
+                breakdown['wallAlgaeCount'] += rng.randint(0, round(level * 3))
+                breakdown['netAlgaeCount'] += rng.randint(0, round(level * 3))
+                endgame = ENDGAMES[min(int((1 - level) * 4 + rng.random()), 3)]
+                breakdown[f'endGameRobot{position}'] = endgame
+                breakdown['endGameBargePoints'] += {'DeepCage': 12, 'ShallowCage': 6, 'Parked': 2}.get(endgame, 0)
+            breakdown['autoCoralPoints'] = breakdown['autoCoralCount'] * 5
+            breakdown['teleopCoralPoints'] = breakdown['teleopCoralCount'] * 3
+            breakdown['algaePoints'] = breakdown['wallAlgaeCount'] * 6 + breakdown['netAlgaeCount'] * 4
+            breakdown['autoPoints'] = breakdown['autoCoralPoints'] + 3
+            breakdown['teleopPoints'] = (breakdown['teleopCoralPoints'] + breakdown['algaePoints']
+                                         + breakdown['endGameBargePoints'])
+            breakdown['totalPoints'] = breakdown['autoPoints'] + breakdown['teleopPoints']
+            match['score_breakdown'][color] = breakdown
+            match['alliances'][color]['score'] = breakdown['totalPoints']
+        matches.append(match)
+    return matches
+
+
+class StubState:
+    def __init__(self, fixtures, latency_ms=50, jitter_ms=20, rate_429=0.0, retry_after=0, max_age=60, seed=1507):
+        self.fixtures = fixtures
+        self.etags = {name: '"%s"' % hashlib.sha1(body).hexdigest()[:16] for name, body in fixtures.items()}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.max_age = max_age
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'ok': 0, 'not_modified': 0, 'not_found': 0, 'throttled': 0}
+
+    def count(self, outcome):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats[outcome] += 1
+
+    def draw(self):
+        with self.lock:
+            delay = max(self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms), 0) / 1000
+            return delay, self.rng.random() < self.rate_429
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def reset(self):
+        with self.lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+
+def make_handler(state):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            if self.path == '/_stats':
+                return self.send_body(200, json.dumps(state.snapshot()).encode())
+
+            delay, throttled = state.draw()
+            time.sleep(delay)
+            if throttled:
+                state.count('throttled')
+                return self.send_body(429, b'{"Error": "rate limited"}', {'Retry-After': str(state.retry_after)})
+
+            member = self.path.split('?', 1)[0].lstrip('/')
+            body = state.fixtures.get(member)
+            if body is None and re.fullmatch(r'tba/teams/\d+/simple', member):
+                body = b'[]'  # like TBA, pages past the last team are empty
+            if body is None:
+                state.count('not_found')
+                return self.send_body(404, b'{"Error": "not found"}')
+
+            etag = state.etags.get(member, '"empty"')
+            headers = {'ETag': etag, 'Cache-Control': f'public, max-age={state.max_age}'}
+            if self.headers.get('If-None-Match') == etag:
+                state.count('not_modified')
+                return self.send_body(304, b'', headers)
+            state.count('ok')
+            return self.send_body(200, body, headers)
+
+        def do_POST(self):
+            if self.path == '/_stats/reset':
+                state.reset()
+                return self.send_body(200, b'{}')
+            return self.send_body(404, b'{}')
+
+        def send_body(self, status, body, headers=None):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub(state, host='127.0.0.1', port=0):
+    """Serves the stub on a background thread; returns the server (server.server_port has the port)."""
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--fixtures', help='.scoutsnap snapshot to replay (default: synthetic event)')
+    parser.add_argument('--teams', type=int, default=40, help='teams in the synthetic event')
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--rate-429', type=float, default=0.0, help='fraction of requests answered with 429')
+    parser.add_argument('--retry-after', type=int, default=0, help='Retry-After seconds sent with each 429')
+    parser.add_argument('--max-age', type=int, default=60, help='Cache-Control max-age on every response')
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else synthesize_fixtures(team_count=args.teams)
+    state = StubState(fixtures, args.latency_ms, args.jitter_ms, args.rate_429, args.retry_after, args.max_age)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    server.daemon_threads = True
+    print(f"Stub upstream serving {len(fixtures)} fixtures on http://{args.host}:{args.port} (tba/, statbotics/)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Gunicorn settings, picked up automatically by `gunicorn app:app`.
+
+A team lookup spends most of its time waiting on TBA and Statbotics, so the
+default worker is gthread: each worker process serves GUNICORN_THREADS
+lookups at once instead of one. With `pip install gevent`, setting
+GUNICORN_WORKER_CLASS=gevent makes every request and upstream call a
+greenlet, so one process holds hundreds of in-flight lookups in a few MB.
+
+Environment:
+    WEB_CONCURRENCY               worker processes (default 2)
+    GUNICORN_WORKER_CLASS         gthread (default), gevent or sync
+    GUNICORN_THREADS              requests per gthread worker (default 32)
+    GUNICORN_WORKER_CONNECTIONS   requests per gevent worker (default 500)
+    PORT                          listen port (default 5000)
+
+Measured with bench/run_bench.py (100 clients, 300 ms upstream, see readme).
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '500'))
+
+# Each lookup fans out about five upstream calls at once; give the app's
+# upstream pool room for all of them (under gevent the app sizes it itself).
+if worker_class == 'gthread':
+    os.environ.setdefault('UPSTREAM_WORKERS', str(threads * 5))
+
+# The app splits its upstream rate limits across this many processes
+os.environ.setdefault('WEB_CONCURRENCY', str(workers))
+
+# A cold lookup can wait out every section timeout plus retries
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
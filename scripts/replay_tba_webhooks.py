@@ -0,0 +1,82 @@
+"""
+Replays recorded TBA webhook payloads against a running scout bot, signed the
+same way TBA signs them, so /webhooks/tba can be tested without a live event.
+
+Usage:
+    TBA_WEBHOOK_SECRET=... python scripts/replay_tba_webhooks.py payloads.jsonl
+    TBA_WEBHOOK_SECRET=... python scripts/replay_tba_webhooks.py --matches 2025nyro_matches.json --delay 0.5
+
+The input is a JSON list or JSON-lines file of webhook messages
+({"message_type": ..., "message_data": ...}). With --matches it is instead a
+saved /event/{key}/matches response, replayed as match_score messages in the
+order the matches were played.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+
+import requests
+
+
+def load_messages(path, from_matches):
+    with open(path, 'r') as f:
+        text = f.read().strip()
+    if text.startswith('['):
+        items = json.loads(text)
+    else:
+        items = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    if not from_matches:
+        return items
+
+    played = [match for match in items if match.get('score_breakdown')]
+    played.sort(key=lambda m: (m.get('actual_time') or m.get('time') or 0, m.get('key', '')))
+    return [
+        {
+            'message_type': 'match_score',
+            'message_data': {
+                'event_key': match.get('event_key'),
+                'match_key': match.get('key'),
+                'match': match,
+            },
+        }
+        for match in played
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='recorded payloads (JSON list or JSON lines)')
+    parser.add_argument('--url', default='http://localhost:5000/webhooks/tba')
+    parser.add_argument('--secret', default=os.getenv('TBA_WEBHOOK_SECRET'))
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds to wait between messages')
+    parser.add_argument('--matches', action='store_true', help='input is an /event/{key}/matches dump')
+    args = parser.parse_args()
+
+    if not args.secret:
+        sys.exit('Set TBA_WEBHOOK_SECRET or pass --secret')
+
+    session = requests.Session()
+    for count, message in enumerate(load_messages(args.path, args.matches), 1):
+        body = json.dumps(message).encode()
+        signature = hmac.new(args.secret.encode(), body, hashlib.sha256).hexdigest()
+        started = time.monotonic()
+        response = session.post(
+            args.url,
+            data=body,
+            headers={'Content-Type': 'application/json', 'X-TBA-HMAC': signature},
+            timeout=10,
+        )
+        elapsed_ms = (time.monotonic() - started) * 1000
+        key = (message.get('message_data') or {}).get('match_key', '')
+        print(f"{count:4d} {message.get('message_type')} {key} -> {response.status_code} ({elapsed_ms:.0f} ms)")
+        if args.delay:
+            time.sleep(args.delay)
+
+
+if __name__ == '__main__':
+    main()